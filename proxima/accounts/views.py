@@ -7,8 +7,13 @@ from .serializers import CustomTokenObtainPairSerializer
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
+    # No authentication: throttling must reject bursts before any DB lookup or password hashing
+    authentication_classes = []
+    throttle_scope = 'login'
 
 class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = RegisterSerializer
-    permission_classes = [permissions.AllowAny]
\ No newline at end of file
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+    throttle_scope = 'register'
\ No newline at end of file
@@ -0,0 +1,63 @@
+import os
+import signal
+import socket
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+
+from jobs import queue
+
+
+class Command(BaseCommand):
+    help = "Run background job workers. Each worker is a thread with its own DB connection."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=1)
+        parser.add_argument('--poll-interval', type=float, default=settings.JOBS.get('POLL_INTERVAL_SECONDS', 2))
+        parser.add_argument('--burst', action='store_true', help="Exit once the queue is empty.")
+
+    def handle(self, *args, **options):
+        self.stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: self.stop.set())
+        signal.signal(signal.SIGINT, lambda *_: self.stop.set())
+
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        threads = [
+            threading.Thread(
+                target=self.work,
+                args=(f"{prefix}:{n}", options['poll_interval'], options['burst']),
+                daemon=True,
+            )
+            for n in range(options['concurrency'])
+        ]
+        self.stdout.write(f"Starting {len(threads)} worker(s).")
+        for thread in threads:
+            thread.start()
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=0.5)
+        self.stdout.write("Workers stopped.")
+
+    def work(self, worker_id, poll_interval, burst):
+        try:
+            while not self.stop.is_set():
+                try:
+                    queue.requeue_stale()
+                    job = queue.claim(worker_id)
+                except OperationalError as exc:
+                    # Lock timeouts / dropped connections: back off and try again
+                    self.stderr.write(f"[{worker_id}] {exc}")
+                    connection.close()
+                    self.stop.wait(poll_interval)
+                    continue
+                if job is None:
+                    if burst:
+                        break
+                    self.stop.wait(poll_interval)
+                    continue
+                ok = queue.run(job)
+                self.stdout.write(f"[{worker_id}] job {job.id} {job.name}: {'ok' if ok else 'failed'}")
+        finally:
+            connection.close()
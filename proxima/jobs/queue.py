@@ -0,0 +1,147 @@
+import logging
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def task(name):
+    """Register ``func(**payload)`` as the handler for jobs called ``name``."""
+    def decorator(func):
+        _registry[name] = func
+        return func
+    return decorator
+
+
+def get_handler(name):
+    return _registry.get(name)
+
+
+def enqueue(name, payload=None, user=None, delay=None, max_attempts=None):
+    if name not in _registry:
+        raise ValueError(f"Unknown job '{name}'.")
+    job = Job(
+        name=name,
+        payload=payload or {},
+        created_by=user,
+        max_attempts=max_attempts or settings.JOBS.get('MAX_ATTEMPTS', 3),
+    )
+    if delay:
+        job.run_at = timezone.now() + delay
+    job.save()
+    return job
+
+
+def backoff(attempts):
+    base = settings.JOBS.get('RETRY_BACKOFF_SECONDS', 10)
+    cap = settings.JOBS.get('RETRY_BACKOFF_MAX_SECONDS', 3600)
+    return timedelta(seconds=min(base * (2 ** (attempts - 1)), cap))
+
+
+def claim(worker_id):
+    """
+    Atomically take the next due job. Uses SELECT ... FOR UPDATE SKIP LOCKED where the
+    database supports it, so concurrent workers never queue up behind each other's rows.
+    """
+    now = timezone.now()
+    due = Job.objects.filter(status='queued', run_at__lte=now).order_by('run_at', 'id')
+    claimed = dict(status='running', attempts=F('attempts') + 1, locked_by=worker_id, locked_at=now)
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job = due.select_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+            Job.objects.filter(pk=job.pk).update(**claimed)
+    else:
+        # SQLite has no row locks: claim with a conditional UPDATE (in autocommit, so the
+        # read never has to upgrade to a write lock) and move on if another worker won
+        for job in due[:10]:
+            if Job.objects.filter(pk=job.pk, status='queued').update(**claimed):
+                break
+        else:
+            return None
+
+    job.refresh_from_db()
+    return job
+
+
+class Heartbeat(threading.Thread):
+    """Refreshes ``locked_at`` while a job runs, so ``requeue_stale()`` only takes jobs whose worker is gone."""
+
+    def __init__(self, job, interval):
+        super().__init__(name=f"job-{job.pk}-heartbeat", daemon=True)
+        self.job = job
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                try:
+                    Job.objects.filter(pk=self.job.pk, status='running', locked_by=self.job.locked_by).update(
+                        locked_at=timezone.now()
+                    )
+                except DatabaseError:
+                    # Missing one beat is fine (STALE_AFTER_SECONDS spans several); reconnect on the next
+                    connection.close()
+        finally:
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def run(job):
+    handler = get_handler(job.name)
+    heartbeat = Heartbeat(job, settings.JOBS.get('HEARTBEAT_SECONDS', 60))
+    heartbeat.start()
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for job '{job.name}'.")
+        result = handler(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning("Job %s (%s) failed on attempt %s", job.id, job.name, job.attempts)
+        if handler is not None and job.attempts < job.max_attempts:
+            Job.objects.filter(pk=job.pk).update(
+                status='queued', error=error, locked_by='', locked_at=None,
+                run_at=timezone.now() + backoff(job.attempts),
+            )
+        else:
+            Job.objects.filter(pk=job.pk).update(status='failed', error=error, finished_at=timezone.now())
+        return False
+    finally:
+        heartbeat.stop()
+
+    Job.objects.filter(pk=job.pk).update(
+        status='succeeded', result=result, error='', finished_at=timezone.now()
+    )
+    return True
+
+
+def requeue_stale():
+    """
+    Put back jobs whose worker died mid-run: still 'running' with no heartbeat for
+    JOBS['STALE_AFTER_SECONDS']. Jobs that were on their last attempt are failed instead,
+    since they may have partly run. Returns the number requeued.
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(status='running', locked_at__lt=now - timedelta(
+        seconds=settings.JOBS.get('STALE_AFTER_SECONDS', 1800)
+    ))
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', error="Worker stopped responding during the last attempt.", finished_at=now,
+    )
+    return stale.filter(attempts__lt=F('max_attempts')).update(status='queued', locked_by='', locked_at=None)
@@ -0,0 +1,85 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from . import queue
+from .models import Job
+
+JOBS = {
+    'MAX_ATTEMPTS': 2,
+    'RETRY_BACKOFF_SECONDS': 10,
+    'RETRY_BACKOFF_MAX_SECONDS': 60,
+    'HEARTBEAT_SECONDS': 60,
+    'STALE_AFTER_SECONDS': 1800,
+}
+
+
+@queue.task('tests.echo')
+def echo(value):
+    return {"value": value}
+
+
+@queue.task('tests.fail')
+def fail():
+    raise RuntimeError("boom")
+
+
+@override_settings(JOBS=JOBS)
+class JobQueueTests(TestCase):
+
+    def test_claim_takes_due_jobs_once(self):
+        later = queue.enqueue('tests.echo', {"value": 2}, delay=timedelta(minutes=5))
+        job = queue.enqueue('tests.echo', {"value": 1})
+
+        claimed = queue.claim('worker-1')
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual(claimed.status, 'running')
+        self.assertEqual(claimed.attempts, 1)
+        self.assertEqual(claimed.locked_by, 'worker-1')
+        # The other job isn't due yet and this one is taken
+        self.assertIsNone(queue.claim('worker-2'))
+        self.assertEqual(Job.objects.get(pk=later.pk).status, 'queued')
+
+    def test_run_stores_result(self):
+        queue.enqueue('tests.echo', {"value": 1})
+
+        self.assertTrue(queue.run(queue.claim('worker-1')))
+        job = Job.objects.get()
+        self.assertEqual(job.status, 'succeeded')
+        self.assertEqual(job.result, {"value": 1})
+
+    def test_failed_job_is_retried_with_backoff_then_failed(self):
+        queue.enqueue('tests.fail')
+
+        started = timezone.now()
+        self.assertFalse(queue.run(queue.claim('worker-1')))
+        job = Job.objects.get()
+        self.assertEqual(job.status, 'queued')
+        self.assertIn("boom", job.error)
+        self.assertGreaterEqual(job.run_at, started + timedelta(seconds=10))
+        self.assertIsNone(queue.claim('worker-1'))  # not due until the backoff passes
+
+        Job.objects.update(run_at=timezone.now())
+        self.assertFalse(queue.run(queue.claim('worker-1')))
+        job = Job.objects.get()
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.attempts, 2)
+
+    def test_backoff_doubles_up_to_the_cap(self):
+        self.assertEqual(
+            [queue.backoff(attempts).total_seconds() for attempts in range(1, 6)],
+            [10, 20, 40, 60, 60],
+        )
+
+    def test_requeue_stale_fails_last_attempts(self):
+        old = timezone.now() - timedelta(hours=1)
+        retryable = Job.objects.create(name='tests.echo', status='running', attempts=1, max_attempts=2, locked_at=old)
+        last = Job.objects.create(name='tests.echo', status='running', attempts=2, max_attempts=2, locked_at=old)
+        alive = Job.objects.create(name='tests.echo', status='running', attempts=1, max_attempts=2,
+                                   locked_at=timezone.now())
+
+        self.assertEqual(queue.requeue_stale(), 1)
+        self.assertEqual(Job.objects.get(pk=retryable.pk).status, 'queued')
+        self.assertEqual(Job.objects.get(pk=last.pk).status, 'failed')
+        self.assertEqual(Job.objects.get(pk=alive.pk).status, 'running')
@@ -0,0 +1,32 @@
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .models import Job
+from .serializers import JobSerializer
+
+
+def accepted_response(job, message):
+    """202 reply for endpoints that hand their work to the job queue."""
+    response = Response({
+        "success": True,
+        "message": message,
+        "data": {"job_id": job.id, "status": job.status, "status_url": f"/api/jobs/{job.id}/"}
+    }, status=status.HTTP_202_ACCEPTED)
+    response['Location'] = f"/api/jobs/{job.id}/"
+    return response
+
+
+class JobDetailView(APIView):
+
+    def get(self, request, pk):
+        jobs = Job.objects.all() if request.user.is_staff else Job.objects.filter(created_by=request.user)
+        try:
+            job = jobs.get(pk=pk)
+        except Job.DoesNotExist:
+            return Response({"success": False, "message": "Job not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            "success": True,
+            "message": "Job retrieved successfully.",
+            "data": JobSerializer(job).data
+        }, status=status.HTTP_200_OK)
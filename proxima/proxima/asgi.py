@@ -2,6 +2,8 @@
 ASGI config for proxima project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The live sale event streams (/api/sales/events/) need it: under WSGI they
+answer 501.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -13,4 +15,13 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'proxima.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from proxima.warmup import warmup_on_import  # noqa: E402  (needs settings configured above)
+from sales.sse import with_sale_events  # noqa: E402
+
+# Sale event streams skip the sync middleware chain so idle subscribers don't each hold a thread
+application = with_sale_events(django_application)
+
+# Sync views run on asgiref's executor thread, not this one, so a connection opened here wouldn't be reused
+warmup_on_import(connect_db=False)
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 from decouple import config
+from corsheaders.defaults import default_headers
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -31,6 +32,7 @@ DEBUG = config('DEBUG', default=False, cast=bool)
 # ]
 ALLOWED_HOSTS = ['*']
 CORS_ALLOW_ALL_ORIGINS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
 # Application definition
 
 INSTALLED_APPS = [
@@ -48,6 +50,7 @@ INSTALLED_APPS += [
     'rest_framework.authtoken',
     'accounts',
     'sales',
+    'jobs',
 ]
 
 MIDDLEWARE = [
@@ -57,6 +60,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     # 'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'sales.audit.AuditMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -98,9 +102,17 @@ DATABASES = {
         'PASSWORD': config('DB_PASSWORD'),
         'HOST': config('DB_HOST'),
         'PORT': config('DB_PORT', cast=int),
+        # Persistent connections: set DB_CONN_MAX_AGE (e.g. 60) for WSGI workers only, so the connection opened by
+        # warmup is reused. Keep 0 under ASGI, where each request's sync code runs in a fresh thread context and
+        # persistent connections are never reused but pile up until max_connections (Django ticket #33497).
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=0, cast=int),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Pre-build URL resolver, serializer fields and DB connections when wsgi.py/asgi.py is imported (proxima/warmup.py)
+WARMUP_ON_IMPORT = config('WARMUP_ON_IMPORT', default=True, cast=bool)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -151,11 +163,88 @@ REST_FRAMEWORK = {
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
-    )
+    ),
+    'DEFAULT_THROTTLE_CLASSES': (
+        'proxima.throttling.AnonIPThrottle',
+        'proxima.throttling.UserThrottle',
+        'proxima.throttling.WriteThrottle',
+        'proxima.throttling.ScopedThrottle',
+    ),
+    # Token buckets: "N/period" = burst of N, refilled at N per period
+    'DEFAULT_THROTTLE_RATES': {
+        'anon': '60/min',
+        'user': '1200/min',
+        'writes': '300/min',
+        'login': '10/min',
+        'register': '5/hour',
+    },
+    # FileStore shares buckets between all worker processes on the host; use LocalMemoryStore for per-process limits
+    'TOKEN_BUCKET_STORE': {
+        'BACKEND': 'proxima.throttling.FileStore',
+        'PATH': config('THROTTLE_STORE_PATH', default=str(BASE_DIR / 'throttle.sqlite3')),
+    },
+    'EXCEPTION_HANDLER': 'proxima.throttling.exception_handler',
+    # Client IPs for the anon/login throttles: X-Forwarded-For is only trusted for this many proxy hops.
+    # 0 uses REMOTE_ADDR (no proxy); set it to 1 behind a single nginx that sets X-Forwarded-For.
+    'NUM_PROXIES': config('NUM_PROXIES', default=0, cast=int),
 }
 
 from datetime import timedelta
 
+# Stored responses for Idempotency-Key retries; purge with `manage.py purge_idempotency_keys`.
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+
+# Background jobs run by `manage.py run_workers`. Running jobs refresh their lock every HEARTBEAT_SECONDS; jobs
+# silent for STALE_AFTER_SECONDS are requeued, or failed if that was their last attempt.
+JOBS = {
+    'MAX_ATTEMPTS': 3,
+    'RETRY_BACKOFF_SECONDS': 10,
+    'RETRY_BACKOFF_MAX_SECONDS': 3600,
+    'HEARTBEAT_SECONDS': 60,
+    'STALE_AFTER_SECONDS': 1800,
+    'POLL_INTERVAL_SECONDS': 2,
+}
+
+# Clients with more sale items than this are deleted by a background job (202) instead of inline
+CLIENT_DELETE_JOB_THRESHOLD = 20000
+
+# Uploaded CSV imports and their error reports (sales/importing.py)
+IMPORT_DIR = config('IMPORT_DIR', default=str(BASE_DIR / 'imports'))
+
+# Quotation PDFs: quotes with POOL_MIN_ITEMS+ items render in a process pool; output is cached per sale version
+QUOTE_PDF = {
+    'POOL_WORKERS': 2,
+    'POOL_MIN_ITEMS': 50,
+    'RENDER_TIMEOUT': 60,
+    'CACHE_TIMEOUT': 60 * 60,
+}
+
+# Live sale events (SSE, sales/events.py). FileBroker shares events between all ASGI workers on the host;
+# LocalBroker keeps them in process (single worker only).
+SALE_EVENTS = {
+    'BACKEND': 'sales.events.FileBroker',
+    'PATH': config('SALE_EVENTS_PATH', default=str(BASE_DIR / 'events.sqlite3')),
+    'BUFFER_SIZE': 1000,
+    'KEEPALIVE_SECONDS': 15,
+}
+
+# Delta sync for offline devices (/api/sync/, sales/sync.py). Rows changed within SETTLE_SECONDS wait for the
+# next call so late-committing transactions aren't skipped; cursors older than TOMBSTONE_TTL must resync fully.
+# Purge old tombstones with `manage.py purge_tombstones`.
+SYNC = {
+    'PAGE_SIZE': 500,
+    'MAX_PAGE_SIZE': 2000,
+    'SETTLE_SECONDS': 5,
+    'TOMBSTONE_TTL': timedelta(days=30),
+}
+
+# Concurrent identical GETs on @coalesced views share one response per process (sales/coalescing.py);
+# followers wait up to WAIT_TIMEOUT seconds before running the view themselves. Counters: /api/coalescing/stats/
+REQUEST_COALESCING = {
+    'ENABLED': True,
+    'WAIT_TIMEOUT': 10,
+}
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=30),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
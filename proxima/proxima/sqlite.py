@@ -0,0 +1,26 @@
+"""
+Small SQLite files shared by the worker processes of one host (throttle buckets,
+sale events). Each thread gets its own connection in autocommit mode with WAL
+journaling, reopened after a fork, and the table is created on first use.
+"""
+import os
+import sqlite3
+import threading
+
+
+class SharedFile:
+    def __init__(self, path, schema, timeout=5):
+        self.path = str(path)
+        self.schema = schema
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None or getattr(self.local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(self.schema)
+            self.local.conn, self.local.pid = conn, os.getpid()
+        return conn
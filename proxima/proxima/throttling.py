@@ -0,0 +1,210 @@
+"""
+Token-bucket throttles for DRF.
+
+Rates use DRF's "N/period" syntax (e.g. "10/min"): a bucket holds N tokens and
+refills at N per period, so short bursts are allowed while the long-run rate is
+capped. Bucket state lives in a store configured by
+``REST_FRAMEWORK['TOKEN_BUCKET_STORE']``:
+
+- ``LocalMemoryStore``: per process, no I/O.
+- ``FileStore``: a small SQLite file shared by every worker process on the host.
+"""
+import threading
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import Throttled
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from .sqlite import SharedFile
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """'10/min' -> (capacity, tokens per second)."""
+    count, period = rate.split('/')
+    capacity = int(count)
+    return capacity, capacity / PERIODS[period[0]]
+
+
+def _refill(tokens, updated, capacity, refill_rate, now):
+    if tokens is None:
+        return float(capacity)
+    return min(float(capacity), tokens + (now - updated) * refill_rate)
+
+
+class LocalMemoryStore:
+    MAX_ENTRIES = 50000
+
+    def __init__(self, **options):
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def warm(self):
+        pass
+
+    def consume(self, key, capacity, refill_rate, now):
+        """Take one token. Returns 0 if allowed, else seconds until a token is available."""
+        with self.lock:
+            tokens, updated = self.buckets.get(key, (None, now))
+            tokens = _refill(tokens, updated, capacity, refill_rate, now)
+            if tokens >= 1:
+                self.buckets[key] = (tokens - 1, now)
+                wait = 0
+            else:
+                self.buckets[key] = (tokens, now)
+                wait = (1 - tokens) / refill_rate
+            if len(self.buckets) > self.MAX_ENTRIES:
+                # Crude bound on memory: forgetting buckets only ever lets a request through early
+                self.buckets.clear()
+            return wait
+
+
+class FileStore:
+    """Buckets in a SQLite file; BEGIN IMMEDIATE makes each take atomic across processes."""
+    PURGE_EVERY = 1000
+    PURGE_AFTER_SECONDS = 86400
+
+    def __init__(self, PATH, **options):
+        self.file = SharedFile(
+            PATH, "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        self.calls = 0
+        # Threads of one process queue here rather than in SQLite's busy handler, which backs off in coarse sleeps
+        self.lock = threading.Lock()
+
+    def _connection(self):
+        return self.file.connection()
+
+    def warm(self):
+        """Open this thread's connection (and create the table) ahead of the first request."""
+        self._connection()
+
+    def consume(self, key, capacity, refill_rate, now):
+        with self.lock:
+            return self._consume(key, capacity, refill_rate, now)
+
+    def _consume(self, key, capacity, refill_rate, now):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens = _refill(row[0] if row else None, row[1] if row else now, capacity, refill_rate, now)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0
+            else:
+                wait = (1 - tokens) / refill_rate
+            conn.execute(
+                "INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens, now),
+            )
+            self.calls += 1
+            if self.calls % self.PURGE_EVERY == 0:
+                conn.execute("DELETE FROM buckets WHERE updated < ?", (now - self.PURGE_AFTER_SECONDS,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+
+@lru_cache(maxsize=None)
+def get_store():
+    options = dict(settings.REST_FRAMEWORK.get('TOKEN_BUCKET_STORE', {}))
+    backend = options.pop('BACKEND', 'proxima.throttling.LocalMemoryStore')
+    return import_string(backend)(**options)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Base class: subclasses pick the scope and the bucket key (or None to skip)."""
+    scope = None
+    timer = time.time
+
+    def get_rate(self, view):
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.get_scope(view))
+
+    def get_scope(self, view):
+        return self.scope
+
+    def get_cache_key(self, request, view):
+        raise NotImplementedError
+
+    def user_or_ident(self, request):
+        if request.user and request.user.is_authenticated:
+            return f"user:{request.user.pk}"
+        return f"ip:{self.get_ident(request)}"
+
+    def allow_request(self, request, view):
+        rate = self.get_rate(view)
+        if rate is None:
+            return True
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+
+        capacity, refill_rate = parse_rate(rate)
+        self.wait_seconds = get_store().consume(
+            f"{self.get_scope(view)}:{key}", capacity, refill_rate, self.timer()
+        )
+        return self.wait_seconds == 0
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class AnonIPThrottle(TokenBucketThrottle):
+    """Per-IP limit for unauthenticated requests (login, register)."""
+    scope = 'anon'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+        return self.get_ident(request)
+
+
+class UserThrottle(TokenBucketThrottle):
+    """Per-user limit for authenticated requests."""
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return str(request.user.pk)
+        return None
+
+
+class WriteThrottle(TokenBucketThrottle):
+    """Per-user (or per-IP) limit on unsafe methods only."""
+    scope = 'writes'
+
+    def get_cache_key(self, request, view):
+        if request.method in ('GET', 'HEAD', 'OPTIONS'):
+            return None
+        return self.user_or_ident(request)
+
+
+class ScopedThrottle(TokenBucketThrottle):
+    """Per-endpoint-class limit: views opt in with ``throttle_scope = '<rate name>'``."""
+
+    def get_scope(self, view):
+        return getattr(view, 'throttle_scope', None)
+
+    def get_cache_key(self, request, view):
+        return self.user_or_ident(request)
+
+
+def exception_handler(exc, context):
+    """DRF's handler, with 429s in the API's {"success", "message"} envelope (Retry-After is kept)."""
+    # Imported here: rest_framework.views loads DEFAULT_THROTTLE_CLASSES from this module on import
+    from rest_framework.views import exception_handler as drf_exception_handler
+
+    response = drf_exception_handler(exc, context)
+    if response is not None and isinstance(exc, Throttled):
+        response.data = {"success": False, "message": str(exc.detail)}
+    return response
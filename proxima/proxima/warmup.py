@@ -0,0 +1,80 @@
+"""
+Worker warmup: pay the one-off costs of a fresh process before it takes traffic.
+
+Called from wsgi.py/asgi.py right after the application is built. If the app is
+preloaded in a master process and then forked (gunicorn --preload), set
+WARMUP_ON_IMPORT=False and call ``warmup()`` from a post_fork hook instead, so
+DB connections are never shared between processes.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+
+def _build_url_resolver():
+    resolver = get_resolver()
+    # Importing every urlconf/view module and compiling its patterns happens lazily on first resolve
+    resolver.url_patterns
+    resolver._populate()
+
+
+def _build_serializers():
+    from accounts.serializers import CustomTokenObtainPairSerializer, RegisterSerializer, UserSerializer
+    from sales.serializers import (
+        ClientSerializer, SaleItemSerializer, SaleSerializer, SaleWithClientUpdateSerializer,
+    )
+
+    for serializer_class in (SaleSerializer, ClientSerializer, SaleItemSerializer, SaleWithClientUpdateSerializer,
+                             UserSerializer, RegisterSerializer, CustomTokenObtainPairSerializer):
+        # Field maps are built lazily; this also fills model _meta caches and validator imports
+        serializer_class().fields
+
+
+def _open_event_broker():
+    from sales.events import get_broker
+    get_broker().warm()
+
+
+def _connect_databases():
+    for alias in connections:
+        connections[alias].ensure_connection()
+
+
+def _open_throttle_store():
+    from proxima.throttling import get_store
+    get_store().warm()
+
+
+STEPS = (
+    ('url_resolver', _build_url_resolver),
+    ('serializers', _build_serializers),
+    ('throttle_store', _open_throttle_store),
+    ('event_broker', _open_event_broker),
+    ('database', _connect_databases),
+)
+
+
+def warmup(connect_db=True):
+    """Run each warmup step, returning {step: seconds}. A failing step is logged, never raised."""
+    timings = {}
+    for name, step in STEPS:
+        if name == 'database' and not connect_db:
+            continue
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            logger.warning("Warmup step '%s' failed", name, exc_info=True)
+        timings[name] = time.perf_counter() - started
+    logger.info("Warmup finished: %s", ", ".join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in timings.items()))
+    return timings
+
+
+def warmup_on_import(connect_db=True):
+    if settings.WARMUP_ON_IMPORT:
+        return warmup(connect_db=connect_db)
@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'proxima.settings')
 
 application = get_wsgi_application()
+
+from proxima.warmup import warmup_on_import  # noqa: E402  (needs settings configured above)
+
+warmup_on_import()
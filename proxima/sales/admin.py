@@ -1,23 +1,89 @@
+from decimal import Decimal, ROUND_HALF_UP
 from django.contrib import admin
+from django.db import transaction
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from .models import Client, Sale, SaleItem
+from .pagination import EstimatedCountPaginator
+from . import sync
+
+class IndexedSearchMixin:
+    """
+    Search on one index per term: a number is looked up with ``numeric_search``, anything
+    else with ``text_search`` (a prefix match). Django's own search ORs a LIKE per search
+    field (across joins, and '=' becomes iexact), which no index can serve.
+    """
+    numeric_search = 'pk'
+    text_search = None
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        lookup = self.numeric_search if term.isdigit() else self.text_search
+        return queryset.filter(**{lookup: term}), False
+
+class SyncTombstoneMixin:
+    """Admin deletes cascade through the ORM; leave sync tombstones for everything they remove."""
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            sync.record_deletes(type(obj).objects.filter(pk=obj.pk), cascade=True)
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            sync.record_deletes(queryset, cascade=True)
+            super().delete_queryset(request, queryset)
 
 @admin.register(Client)
-class ClientAdmin(admin.ModelAdmin):
+class ClientAdmin(IndexedSearchMixin, SyncTombstoneMixin, admin.ModelAdmin):
     list_display = ('name', 'phone', 'arc_name', 'created_at')
-    search_fields = ('name', 'phone', 'arc_name')
+    search_fields = ('name', 'phone')
+    search_help_text = "Start of the name, or of the phone number."
+    numeric_search = 'phone__istartswith'
+    text_search = 'name__istartswith'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 @admin.register(Sale)
-class SaleAdmin(admin.ModelAdmin):
+class SaleAdmin(IndexedSearchMixin, SyncTombstoneMixin, admin.ModelAdmin):
     list_display = ('id', 'created_by', 'client', 'status', 'created_at', 'total_amount_display')
-    list_filter = ('status', 'created_at')
-    search_fields = ('client__name', 'created_by__username')
+    list_filter = ('status',)
+    list_select_related = ('client', 'created_by')
+    date_hierarchy = 'created_at'
+    search_fields = ('id', 'client__name')
+    search_help_text = "Sale number, or the start of the client's name."
+    text_search = 'client__name__istartswith'
+    raw_id_fields = ('client', 'created_by')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        # Correlated subquery: only evaluated for the rows on the current page, via the sale_id index
+        item_totals = (
+            SaleItem.objects.filter(sale=OuterRef('pk')).order_by()
+            .values('sale').annotate(total=Sum('total_amount')).values('total')
+        )
+        return super().get_queryset(request).annotate(
+            annotated_total=Coalesce(
+                Subquery(item_totals), Value(Decimal('0.00')),
+                output_field=DecimalField(max_digits=14, decimal_places=2),
+            )
+        )
 
     def total_amount_display(self, obj):
-        return obj.total_amount
+        return obj.annotated_total.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
     total_amount_display.short_description = 'Total Amount'
 
 @admin.register(SaleItem)
-class SaleItemAdmin(admin.ModelAdmin):
+class SaleItemAdmin(IndexedSearchMixin, SyncTombstoneMixin, admin.ModelAdmin):
     list_display = ('product_name', 'category', 'quantity', 'mrp', 'discount_type', 'discount_value', 'price_per_piece', 'total_amount')
-    list_filter = ('category', 'discount_type')
-    search_fields = ('product_name', 'room')
\ No newline at end of file
+    list_filter = ('category',)
+    search_fields = ('sale__id', 'product_name')
+    search_help_text = "Sale number, or the start of the product name."
+    numeric_search = 'sale_id'
+    text_search = 'product_name__istartswith'
+    raw_id_fields = ('sale',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
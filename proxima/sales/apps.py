@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class SalesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'sales'
+
+    def ready(self):
+        from . import events, signals
+        signals.changes_committed.connect(events.publish_changes, dispatch_uid='sales.events.publish_changes')
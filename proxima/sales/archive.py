@@ -0,0 +1,71 @@
+"""
+Move old/cancelled sales into the archive tables with batched INSERT ... SELECT + DELETE.
+"""
+from django.db import connections, transaction
+from django.utils import timezone
+
+from . import sync
+from .models import ArchivedSale, ArchivedSaleItem, Sale, SaleItem
+
+
+def _copy_sql(source, target, extra=None):
+    """INSERT INTO target (cols) SELECT cols FROM source WHERE <fk> IN (...) for the columns both tables share."""
+    qn = connections[source.objects.db].ops.quote_name
+    target_columns = {field.column for field in target._meta.concrete_fields}
+    columns = [field.column for field in source._meta.concrete_fields if field.column in target_columns]
+    insert_columns = [qn(column) for column in columns]
+    select_columns = [qn(column) for column in columns]
+    for column in extra or ():
+        insert_columns.append(qn(column))
+        select_columns.append('%s')
+    return (
+        f"INSERT INTO {qn(target._meta.db_table)} ({', '.join(insert_columns)}) "
+        f"SELECT {', '.join(select_columns)} FROM {qn(source._meta.db_table)} WHERE {{where}}"
+    )
+
+
+def archive_batch(sale_ids):
+    """Copy the given sales and their items into the archive tables and delete the originals."""
+    connection = connections[Sale.objects.db]
+    qn = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(sale_ids))
+    now = timezone.now()
+
+    with transaction.atomic(using=connection.alias), sync.dated_at_commit(), connection.cursor() as cursor:
+        cursor.execute(
+            _copy_sql(Sale, ArchivedSale, extra=['archived_at']).format(where=f"{qn('id')} IN ({placeholders})"),
+            [now, *sale_ids],
+        )
+        sales = cursor.rowcount
+        cursor.execute(
+            _copy_sql(SaleItem, ArchivedSaleItem).format(where=f"{qn('sale_id')} IN ({placeholders})"),
+            sale_ids,
+        )
+        items = cursor.rowcount
+
+        # Archived sales leave the synced data set, so devices drop them like deleted ones
+        sync.record_deletes(Sale.objects.filter(id__in=sale_ids), cascade=True)
+        doomed_items = SaleItem.objects.filter(sale_id__in=sale_ids)
+        doomed_items._raw_delete(doomed_items.db)
+        doomed_sales = Sale.objects.filter(id__in=sale_ids)
+        doomed_sales._raw_delete(doomed_sales.db)
+
+    return sales, items
+
+
+def archive_sales(older_than=None, statuses=None, batch_size=500):
+    """
+    Archive sales created before ``older_than`` (a datetime) and/or with one of ``statuses``.
+    Yields (sales, items) per committed batch so callers can report progress.
+    """
+    candidates = Sale.objects.all()
+    if statuses:
+        candidates = candidates.filter(status__in=statuses)
+    if older_than:
+        candidates = candidates.filter(created_at__lt=older_than)
+
+    while True:
+        sale_ids = list(candidates.order_by('id').values_list('id', flat=True)[:batch_size])
+        if not sale_ids:
+            break
+        yield archive_batch(sale_ids)
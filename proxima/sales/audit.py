@@ -0,0 +1,133 @@
+"""
+Change history for sales, sale items and clients.
+
+Call sites record field-level diffs with ``record()``. Entries made inside a
+transaction only count once it commits (``transaction.on_commit``), so rolled-back
+writes leave no history. ``AuditMiddleware`` collects a request's entries and
+writes them with a single ``bulk_create`` after the view returns; ``collect()``
+does the same for a block of job code. Otherwise committed entries are written
+straight away. Each write
+sends ``sales.signals.changes_committed`` (the live event feed listens to it).
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+
+from .signals import changes_committed
+
+_buffer = ContextVar('audit_buffer', default=None)
+_request = ContextVar('audit_request', default=None)
+
+
+def snapshot(instance, fields=None):
+    """{field name: raw value} of the instance's concrete, non-pk fields (FKs as ids)."""
+    values = {}
+    for field in instance._meta.concrete_fields:
+        if field.primary_key or (fields is not None and field.name not in fields):
+            continue
+        values[field.name] = getattr(instance, field.attname)
+    return values
+
+
+def raw_values(model, fields):
+    """Turn assignment kwargs (client=<Client>) into snapshot form (client=<id>)."""
+    values = {}
+    for name, value in fields.items():
+        field = model._meta.get_field(name)
+        if field.is_relation and value is not None and hasattr(value, 'pk'):
+            value = value.pk
+        values[name] = value
+    return values
+
+
+def diff(before, after):
+    return {name: [before.get(name), value] for name, value in after.items() if before.get(name) != value}
+
+
+def _sale_id(instance):
+    name = instance._meta.model_name
+    if name == 'sale':
+        return instance.pk
+    if name == 'saleitem':
+        return instance.sale_id
+    return None
+
+
+def record(instance, action, changes, sale_id=None):
+    """Buffer one history entry; ``changes`` is {field: [old, new]} (updates) or {field: value}."""
+    from .models import HistoryEntry
+
+    if action == 'update' and not changes:
+        return
+    entry = HistoryEntry(
+        model=instance._meta.model_name,
+        object_id=instance.pk,
+        sale_id=sale_id if sale_id is not None else _sale_id(instance),
+        action=action,
+        changes=changes,
+    )
+    transaction.on_commit(lambda: _keep(entry))
+
+
+def record_create(instance, sale_id=None):
+    record(instance, 'create', snapshot(instance), sale_id)
+
+
+def record_delete(instance, sale_id=None):
+    record(instance, 'delete', snapshot(instance), sale_id)
+
+
+def _keep(entry):
+    buffer = _buffer.get()
+    if buffer is not None:
+        buffer.append(entry)
+    else:
+        _write([entry])
+
+
+def _write(entries):
+    from .models import HistoryEntry
+
+    request = _request.get()
+    user = getattr(request, 'user', None) if request is not None else None
+    if user is not None and user.is_authenticated:
+        for entry in entries:
+            entry.user_id = user.pk
+    HistoryEntry.objects.bulk_create(entries)
+    changes_committed.send(sender=HistoryEntry, entries=entries)
+
+
+@contextmanager
+def collect():
+    """Outside a request (jobs, commands): write the entries recorded in the block in one INSERT at the end."""
+    token = _buffer.set([])
+    try:
+        yield
+    finally:
+        entries = _buffer.get()
+        _buffer.reset(token)
+        if entries:
+            _write(entries)
+
+
+class AuditMiddleware:
+    """Collect history entries for the request and write them in one INSERT at the end."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        buffer_token = _buffer.set([])
+        request_token = _request.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            entries = _buffer.get()
+            try:
+                if entries:
+                    # DRF authenticates inside the view and copies the user onto this request
+                    _write(entries)
+            finally:
+                _buffer.reset(buffer_token)
+                _request.reset(request_token)
@@ -0,0 +1,49 @@
+"""
+Server-side "duplicate quote as new draft": one INSERT ... SELECT copies all items.
+"""
+from django.db import connections, transaction
+from django.utils import timezone
+
+from . import audit
+from .models import Sale, SaleItem
+
+
+def clone_sale(sale, user, client, rooms=None):
+    """
+    Create a draft for ``client`` with copies of ``sale``'s items. With ``rooms``, only items in
+    those rooms are copied (None in the list: items without a room; an empty list: no items).
+    Prices are copied as stored; they were computed by SaleItem.calculate_prices when saved.
+    Returns (new_sale, item_count).
+    """
+    connection = connections[SaleItem.objects.db]
+    qn = connection.ops.quote_name
+    table = qn(SaleItem._meta.db_table)
+    columns = [
+        qn(field.column) for field in SaleItem._meta.concrete_fields
+        if not field.primary_key and field.name not in ('sale', 'updated_at')
+    ]
+
+    with transaction.atomic(using=connection.alias):
+        new_sale = Sale.objects.create(created_by=user, client=client, status='draft')
+
+        sql = (
+            f"INSERT INTO {table} ({qn('sale_id')}, {qn('updated_at')}, {', '.join(columns)}) "
+            f"SELECT %s, %s, {', '.join(columns)} FROM {table} WHERE {qn('sale_id')} = %s"
+        )
+        params = [new_sale.id, connection.ops.adapt_datetimefield_value(timezone.now()), sale.id]
+        if rooms is not None:
+            named = [room for room in rooms if room is not None]
+            conditions = [f"{qn('room')} IN ({', '.join(['%s'] * len(named))})"] if named else []
+            if len(named) < len(rooms):
+                conditions.append(f"{qn('room')} IS NULL")
+            params += named
+            sql += f" AND ({' OR '.join(conditions) or '1 = 0'})"
+        sql += f" ORDER BY {qn('id')}"
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            item_count = cursor.rowcount
+
+        audit.record(new_sale, 'create', dict(audit.snapshot(new_sale), cloned_from=sale.id, items=item_count))
+
+    return new_sale, item_count
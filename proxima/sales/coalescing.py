@@ -0,0 +1,132 @@
+"""
+Single-flight for read endpoints: concurrent identical GETs share one computation.
+
+When many devices ask for the same page at once (store opening), the first
+request (the leader) runs the view and the ones that arrive while it is still
+running (followers) wait for it and answer with a copy of its response data,
+instead of each running the same queries and serialization. Requests are
+identical when they hit the same view with the same path and query string and,
+unless the route is marked ``per_user=False``, come from the same user.
+
+Coalescing is per process and opt-in per view method with ``@coalesced``. It
+runs after DRF's authentication, permission and throttle checks, so every
+follower is authorized on its own. Only successful ``Response`` objects are
+shared; if the leader raises or returns anything else, followers run the view
+themselves. ``settings.REQUEST_COALESCING`` turns it off (``ENABLED``) and
+bounds how long a follower waits (``WAIT_TIMEOUT`` seconds).
+"""
+import threading
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from rest_framework.response import Response
+
+# Response headers that belong to the follower's own response, not the leader's
+_OWN_HEADERS = {'content-type', 'content-length'}
+
+
+def get_settings():
+    defaults = {'ENABLED': True, 'WAIT_TIMEOUT': 10}
+    return dict(defaults, **getattr(settings, 'REQUEST_COALESCING', {}))
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+
+
+class Metrics:
+    """Per-route counters for this process: leaders ran the view, coalesced requests shared their result."""
+    FIELDS = ('requests', 'leaders', 'coalesced', 'fallbacks')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes = {}
+
+    def incr(self, route, field):
+        with self.lock:
+            counts = self.routes.setdefault(route, dict.fromkeys(self.FIELDS, 0))
+            counts[field] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {route: dict(counts) for route, counts in sorted(self.routes.items())}
+
+    def reset(self):
+        with self.lock:
+            self.routes.clear()
+
+
+class SingleFlight:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.metrics = Metrics()
+
+    def do(self, route, key, fn, timeout):
+        """``fn()``, run once for all concurrent callers with the same key."""
+        self.metrics.incr(route, 'requests')
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+
+        if not leader:
+            if call.done.wait(timeout) and call.response is not None:
+                self.metrics.incr(route, 'coalesced')
+                return _copy(call.response)
+            self.metrics.incr(route, 'fallbacks')
+            return fn()
+
+        self.metrics.incr(route, 'leaders')
+        try:
+            response = fn()
+            if isinstance(response, Response) and not response.exception and 200 <= response.status_code < 300:
+                call.response = response
+            return response
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+
+def _copy(response):
+    # ``data`` is only read from here on (rendering), so followers can share it
+    copy = Response(response.data, status=response.status_code)
+    for header, value in response.items():
+        if header.lower() not in _OWN_HEADERS:
+            copy[header] = value
+    return copy
+
+
+flights = SingleFlight()
+
+
+def request_key(route, request, per_user=True):
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    user = request.user.pk if per_user else None
+    return route, request.path, query, user
+
+
+def coalesced(view_func=None, *, per_user=True):
+    """
+    Let concurrent identical calls of a GET view method share one response.
+    Use ``per_user=False`` when the response doesn't depend on who asks.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(self, request, *args, **kwargs):
+            options = get_settings()
+            if request.method != 'GET' or not options['ENABLED']:
+                return view_func(self, request, *args, **kwargs)
+            route = f"{type(self).__name__}.{view_func.__name__}"
+            return flights.do(
+                route, request_key(route, request, per_user),
+                lambda: view_func(self, request, *args, **kwargs), options['WAIT_TIMEOUT'],
+            )
+        return wrapper
+
+    return decorator(view_func) if view_func is not None else decorator
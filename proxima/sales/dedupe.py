@@ -0,0 +1,138 @@
+"""
+Duplicate client detection and merging.
+
+Every client carries two blocking keys, kept up to date by ``Client.save()``:
+
+- ``phone_key``: the last 10 digits of the phone, so "+91 98765-43210",
+  "098765 43210" and "9876543210" all match.
+- ``name_key``: the name lowercased, without accents, punctuation or titles,
+  with its words sorted, so "Dr. Rahul  Sharma" and "sharma rahul" match.
+
+Both are indexed. Candidate duplicates are clients sharing a key, found with a
+GROUP BY over the index instead of comparing every pair of clients. Keys shared
+by more than ``MAX_GROUP_SIZE`` clients (placeholder names, shop phones) are
+too generic to mean "same person" and are skipped.
+"""
+import re
+import unicodedata
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from . import audit, events
+
+PHONE_KEY_DIGITS = 10
+MIN_PHONE_DIGITS = 6
+MAX_GROUP_SIZE = 50
+MAX_SUGGESTIONS = 10
+KEY_FIELDS = {'phone': 'phone_key', 'name': 'name_key'}
+# Blank fields on the surviving client are filled from the merged ones, oldest first
+FILL_FIELDS = ('phone', 'address', 'attend_by', 'arc_name', 'arc_phone', 'arc_address')
+_TITLES = {'mr', 'mrs', 'ms', 'miss', 'dr', 'shri', 'smt', 'sri'}
+
+
+def phone_key(phone):
+    digits = re.sub(r'\D', '', phone or '')
+    if len(digits) < MIN_PHONE_DIGITS:
+        return None
+    return digits[-PHONE_KEY_DIGITS:]
+
+
+def name_key(name):
+    text = unicodedata.normalize('NFKD', name or '')
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    words = [word for word in re.sub(r'[^\w\s]', ' ', text).split() if word not in _TITLES]
+    return ' '.join(sorted(words))[:255] or None
+
+
+def match_keys(name, phone):
+    return {'phone_key': phone_key(phone), 'name_key': name_key(name)}
+
+
+def suggest_matches(name=None, phone=None, exclude_id=None):
+    """Existing clients with the same phone or name key, in one query over the two key indexes."""
+    from .models import Client
+
+    keys = match_keys(name, phone)
+    condition = Q()
+    for field, value in keys.items():
+        if value:
+            condition |= Q(**{field: value})
+    if not condition:
+        return []
+
+    queryset = Client.objects.filter(condition)
+    if exclude_id is not None:
+        queryset = queryset.exclude(pk=exclude_id)
+    return list(queryset.order_by('created_at', 'id')[:MAX_SUGGESTIONS])
+
+
+def duplicate_keys(by='phone'):
+    """Queryset of {key, count} for every key shared by 2..MAX_GROUP_SIZE clients, largest groups first."""
+    from .models import Client
+
+    field = KEY_FIELDS[by]
+    return (
+        Client.objects.exclude(**{f'{field}__isnull': True})
+        .values(key=F(field)).annotate(count=Count('id'))
+        .filter(count__gt=1, count__lte=MAX_GROUP_SIZE)
+        .order_by('-count', 'key')
+    )
+
+
+def duplicate_groups(keys, by='phone'):
+    """[{key, clients}] for a page of ``duplicate_keys``; all clients are fetched in one query."""
+    from .models import Client
+
+    field = KEY_FIELDS[by]
+    keys = [row['key'] for row in keys]
+    members = {key: [] for key in keys}
+    for client in Client.objects.filter(**{f'{field}__in': keys}).order_by('created_at', 'id'):
+        members[getattr(client, field)].append(client)
+    return [{'key': key, 'clients': members[key]} for key in keys]
+
+
+def merge_clients(target, source_ids):
+    """
+    Fold the ``source_ids`` clients into ``target``: their sales (live and archived)
+    are repointed with one UPDATE each, blank target fields are filled in, and the
+    sources are deleted. Returns counts of what moved.
+    """
+    from . import sync
+    from .models import ArchivedSale, Client, Sale
+
+    source_ids = sorted({int(pk) for pk in source_ids} - {target.pk})
+    with transaction.atomic():
+        sources = list(Client.objects.select_for_update().filter(pk__in=source_ids).order_by('created_at', 'id'))
+        source_ids = [source.pk for source in sources]
+        if not source_ids:
+            return {'merged': 0, 'sales': 0, 'archived_sales': 0}
+
+        before = audit.snapshot(target)
+        filled = []
+        for field in FILL_FIELDS:
+            if getattr(target, field):
+                continue
+            value = next((getattr(source, field) for source in sources if getattr(source, field)), None)
+            if value:
+                setattr(target, field, value)
+                filled.append(field)
+        if filled:
+            target.save()
+            audit.record(target, 'update', audit.diff(before, audit.snapshot(target)))
+
+        # Sales change client, so their version moves on and stale editors get a 409
+        events.publish_sales(Sale.objects.filter(client_id__in=source_ids).values_list('id', flat=True))
+        sales = Sale.objects.filter(client_id__in=source_ids).update(
+            client_id=target.pk, version=F('version') + 1, updated_at=timezone.now()
+        )
+        archived = ArchivedSale.objects.filter(client_id__in=source_ids).update(client_id=target.pk)
+
+        for source in sources:
+            audit.record(source, 'merge', dict(audit.snapshot(source), merged_into=target.pk))
+        merged = Client.objects.filter(pk__in=source_ids)
+        sync.record_deletes(merged)
+        merged.delete()
+
+    return {'merged': len(source_ids), 'sales': sales, 'archived_sales': archived}
@@ -0,0 +1,75 @@
+"""
+Set-based deletes for clients and sales.
+
+``Model.delete()`` makes Django's Collector load every related Sale and SaleItem and
+send per-object signals first. These helpers instead issue chunked
+``DELETE ... WHERE sale_id IN (...)`` statements inside one transaction. They return
+the same ``(total, {label: count})`` shape as ``Model.delete()``. ``purge()`` clears
+expired bookkeeping rows (idempotency keys, tombstones) in short batches.
+"""
+from django.db import transaction
+
+from . import audit, sync
+from .models import ArchivedSale, ArchivedSaleItem, Client, Sale, SaleItem
+
+CHUNK_SIZE = 1000
+
+
+def _counts(items, sales, clients=0):
+    counts = {SaleItem._meta.label: items, Sale._meta.label: sales}
+    if clients:
+        counts[Client._meta.label] = clients
+    return sum(counts.values()), counts
+
+
+def _delete_sale_chunks(sales, chunk_size):
+    items_deleted = sales_deleted = 0
+    while True:
+        sale_ids = list(sales.order_by('id').values_list('id', flat=True)[:chunk_size])
+        if not sale_ids:
+            break
+        sync.record_deletes(Sale.objects.filter(id__in=sale_ids), cascade=True)
+        items = SaleItem.objects.filter(sale_id__in=sale_ids)
+        items_deleted += items._raw_delete(items.db)
+        chunk = Sale.objects.filter(id__in=sale_ids)
+        sales_deleted += chunk._raw_delete(chunk.db)
+    return items_deleted, sales_deleted
+
+
+def _delete_archived(client_id):
+    # Archived rows have no FK constraint, so clear them explicitly instead of leaving orphans
+    archived_ids = ArchivedSale.objects.filter(client_id=client_id).values('id')
+    archived_items = ArchivedSaleItem.objects.filter(sale_id__in=archived_ids)
+    archived_items._raw_delete(archived_items.db)
+    archived = ArchivedSale.objects.filter(client_id=client_id)
+    archived._raw_delete(archived.db)
+
+
+def delete_sales(sale_ids, chunk_size=CHUNK_SIZE):
+    with transaction.atomic(), sync.dated_at_commit():
+        items, sales = _delete_sale_chunks(Sale.objects.filter(id__in=sale_ids), chunk_size)
+    return _counts(items, sales)
+
+
+def delete_client(client_id, chunk_size=CHUNK_SIZE):
+    with transaction.atomic(), sync.dated_at_commit():
+        client = Client.objects.filter(id=client_id).first()
+        if client is not None:
+            audit.record_delete(client)
+        items, sales = _delete_sale_chunks(Sale.objects.filter(client_id=client_id), chunk_size)
+        _delete_archived(client_id)
+        client = Client.objects.filter(id=client_id)
+        sync.record_deletes(client)
+        clients = client._raw_delete(client.db)
+    return _counts(items, sales, clients)
+
+
+def purge(queryset, batch_size=5000):
+    """Delete the rows of ``queryset`` a batch of ids at a time, so no statement locks many rows; returns the count."""
+    deleted = 0
+    while True:
+        ids = list(queryset.order_by().values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        count, _ = queryset.model.objects.filter(id__in=ids).delete()
+        deleted += count
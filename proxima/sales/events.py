@@ -0,0 +1,270 @@
+"""
+Live sale change events for the Server-Sent Events feed (``sales.sse``).
+
+Every committed batch of change history (``sales.signals.changes_committed``)
+becomes one event per affected sale, listing what changed so clients know to
+refetch it. Bulk paths that write no per-row history (CSV imports, client
+merges) publish one event per sale through ``publish_sales()`` instead. Events
+go through a broker configured by ``settings.SALE_EVENTS``:
+
+- ``LocalBroker``: in-process pub/sub. Only subscribers of the worker that
+  handled the write see the event, so use it with a single ASGI worker.
+- ``FileBroker``: events are appended to a small SQLite file shared by every
+  worker on the host; each worker polls it and fans new rows out to its own
+  subscribers.
+
+Both keep recent events so a reconnecting client can resume from its
+``Last-Event-ID``. If that id is unknown or too old, the stream starts with a
+``reset`` event and the client should refetch everything it shows.
+"""
+import asyncio
+import itertools
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque, namedtuple
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from proxima.sqlite import SharedFile
+
+Event = namedtuple('Event', 'id seq sale_id data')
+
+
+class Subscription:
+    """One connected stream: an asyncio queue fed from whichever thread publishes."""
+
+    def __init__(self, broker, sale_id=None, queue_size=100):
+        self.broker = broker
+        self.sale_id = sale_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=queue_size)
+
+    def deliver(self, event):
+        if self.sale_id is not None and event.sale_id != self.sale_id:
+            return
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:  # event loop closed
+            self.close()
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A client this far behind reconnects and resumes from its Last-Event-ID instead
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+    async def get(self, timeout):
+        """Next event, None if the subscription overflowed; raises TimeoutError when idle."""
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    def __init__(self, BUFFER_SIZE=1000, QUEUE_SIZE=100, **options):
+        self.buffer = deque(maxlen=BUFFER_SIZE)
+        self.queue_size = QUEUE_SIZE
+        self.subscribers = set()
+        self.lock = threading.Lock()
+        # Ids are "<epoch>-<n>": an id from another process (or before a restart) is recognised as unknown
+        self.epoch = uuid.uuid4().hex[:8]
+        self.counter = itertools.count(1)
+
+    def warm(self):
+        pass
+
+    def publish(self, sale_id, data):
+        with self.lock:
+            seq = next(self.counter)
+            event = Event(f"{self.epoch}-{seq}", seq, sale_id, data)
+            self.buffer.append(event)
+        self.dispatch(event)
+
+    def dispatch(self, event):
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for subscription in subscribers:
+            subscription.deliver(event)
+
+    def parse_id(self, event_id):
+        epoch, _, seq = (event_id or '').partition('-')
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def since(self, event_id, sale_id=None):
+        """Buffered events after ``event_id``, or None when it can't be resumed from here."""
+        seq = self.parse_id(event_id)
+        with self.lock:
+            buffered = list(self.buffer)
+        if seq is None or (buffered and seq < buffered[0].seq - 1):
+            return None
+        return [event for event in buffered if event.seq > seq and (sale_id is None or event.sale_id == sale_id)]
+
+    def subscribe(self, sale_id=None):
+        subscription = Subscription(self, sale_id, self.queue_size)
+        with self.lock:
+            self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscribers.discard(subscription)
+
+
+class FileBroker(LocalBroker):
+    """Events in a SQLite file shared by the host's workers; a poller thread per worker delivers them."""
+    PURGE_EVERY = 100
+
+    def __init__(self, PATH, POLL_INTERVAL=0.5, RETENTION_SECONDS=3600, **options):
+        super().__init__(**options)
+        self.file = SharedFile(
+            PATH, "CREATE TABLE IF NOT EXISTS events "
+                  "(id INTEGER PRIMARY KEY AUTOINCREMENT, sale_id INTEGER, data TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self.poll_interval = POLL_INTERVAL
+        self.retention = RETENTION_SECONDS
+        self.poller = None
+        self.cursor = None
+
+    def _connection(self):
+        return self.file.connection()
+
+    def warm(self):
+        self._connection()
+
+    def publish(self, sale_id, data):
+        self._connection().execute(
+            "INSERT INTO events (sale_id, data, created) VALUES (?, ?, ?)",
+            (sale_id, json.dumps(data, cls=DjangoJSONEncoder), time.time()),
+        )
+
+    def parse_id(self, event_id):
+        return int(event_id) if (event_id or '').isdigit() else None
+
+    def _rows(self, after, sale_id=None, limit=None):
+        sql, params = "SELECT id, sale_id, data FROM events WHERE id > ?", [after]
+        if sale_id is not None:
+            sql, params = sql + " AND sale_id = ?", params + [sale_id]
+        sql += " ORDER BY id"
+        if limit:
+            sql, params = sql + " LIMIT ?", params + [limit]
+        return [Event(str(row[0]), row[0], row[1], json.loads(row[2]))
+                for row in self._connection().execute(sql, params)]
+
+    def since(self, event_id, sale_id=None):
+        seq = self.parse_id(event_id)
+        if seq is None:
+            return None
+        oldest = self._connection().execute("SELECT MIN(id) FROM events").fetchone()[0]
+        if oldest is not None and seq < oldest - 1:
+            return None
+        events = self._rows(seq, sale_id, self.buffer.maxlen + 1)
+        return None if len(events) > self.buffer.maxlen else events
+
+    def subscribe(self, sale_id=None):
+        subscription = super().subscribe(sale_id)
+        with self.lock:
+            if self.poller is None or not self.poller.is_alive():
+                self.cursor = self._connection().execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+                self.poller = threading.Thread(target=self._poll, name='sale-events-poller', daemon=True)
+                self.poller.start()
+        return subscription
+
+    def _poll(self):
+        for polls in itertools.count(1):
+            time.sleep(self.poll_interval)
+            try:
+                for event in self._rows(self.cursor, limit=500):
+                    self.cursor = event.seq
+                    self.dispatch(event)
+                if polls % self.PURGE_EVERY == 0:
+                    self._connection().execute("DELETE FROM events WHERE created < ?", (time.time() - self.retention,))
+            except sqlite3.Error:
+                continue
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    options = dict(getattr(settings, 'SALE_EVENTS', {}))
+    backend = options.pop('BACKEND', 'sales.events.LocalBroker')
+    return import_string(backend)(**options)
+
+
+def publish_changes(sender, entries, **kwargs):
+    """``changes_committed`` receiver: one event per sale touched by the batch."""
+    changes = {}
+    for entry in entries:
+        if entry.sale_id is not None:
+            changes.setdefault(entry.sale_id, []).append(
+                {"model": entry.model, "object_id": entry.object_id, "action": entry.action}
+            )
+    broker = get_broker()
+    for sale_id, sale_changes in changes.items():
+        broker.publish(sale_id, {"sale_id": sale_id, "changes": sale_changes})
+
+
+def publish_sales(sale_ids, action='update'):
+    """
+    Events for bulk writes that record no per-row history (imports, client merges):
+    one per sale, naming only the sale, sent once the current transaction commits.
+    """
+    sale_ids = sorted(set(sale_ids))
+    if not sale_ids:
+        return
+
+    def publish():
+        broker = get_broker()
+        for sale_id in sale_ids:
+            broker.publish(sale_id, {
+                "sale_id": sale_id, "changes": [{"model": "sale", "object_id": sale_id, "action": action}],
+            })
+
+    transaction.on_commit(publish)
+
+
+def _format(event, name='sale'):
+    return f"id: {event.id}\nevent: {name}\ndata: {json.dumps(event.data, cls=DjangoJSONEncoder)}\n\n".encode()
+
+
+async def stream(sale_id=None, last_event_id=None):
+    """Async iterator of SSE frames: missed events (if resuming), then live ones until the client goes."""
+    broker = get_broker()
+    keepalive = getattr(settings, 'SALE_EVENTS', {}).get('KEEPALIVE_SECONDS', 15)
+    # Subscribe before reading the backlog so nothing published in between is lost
+    subscription = broker.subscribe(sale_id)
+    try:
+        yield b"retry: 3000\n\n"
+        last_seq = 0
+        if last_event_id:
+            backlog = broker.since(last_event_id, sale_id)
+            if backlog is None:
+                yield b"event: reset\ndata: {}\n\n"
+            else:
+                for event in backlog:
+                    last_seq = event.seq
+                    yield _format(event)
+
+        while True:
+            try:
+                event = await subscription.get(keepalive)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+            if event is None:
+                break
+            if event.seq > last_seq:
+                yield _format(event)
+    finally:
+        subscription.close()
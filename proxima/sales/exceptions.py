@@ -0,0 +1,28 @@
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class EnvelopeAPIException(APIException):
+    """APIException whose body keeps the API's {"success": ..., "message": ...} envelope with a real boolean."""
+
+    def __init__(self, detail=None, code=None):
+        super().__init__(detail, code)
+        self.detail = {"success": False, "message": self.detail}
+
+
+class SaleVersionConflict(EnvelopeAPIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "This sale was modified by someone else. Reload it and try again."
+    default_code = 'conflict'
+
+
+class QuoteRenderUnavailable(EnvelopeAPIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "The quote could not be rendered right now. Try again."
+    default_code = 'quote_render_unavailable'
+
+
+class QuoteRenderTimeout(EnvelopeAPIException):
+    status_code = status.HTTP_504_GATEWAY_TIMEOUT
+    default_detail = "Rendering the quote took too long. Try again later."
+    default_code = 'quote_render_timeout'
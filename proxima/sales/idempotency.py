@@ -0,0 +1,93 @@
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+DEFAULT_TTL = timedelta(hours=24)
+
+
+def get_ttl():
+    return getattr(settings, 'IDEMPOTENCY_KEY_TTL', DEFAULT_TTL)
+
+
+def request_fingerprint(request):
+    payload = json.dumps(request.data, sort_keys=True, default=str)
+    raw = f"{request.method}:{request.path}:{payload}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def idempotent(view_func):
+    """
+    Make a viewset method safe to retry with an ``Idempotency-Key`` header.
+
+    The key row is inserted in the same transaction as the view's writes, so a
+    concurrent retry blocks on the unique constraint until the first request
+    commits and then replays its stored response. Views that raise (validation
+    errors etc.) roll back the key along with everything else.
+    """
+    @wraps(view_func)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view_func(self, request, *args, **kwargs)
+
+        if len(key) > 255:
+            return Response({"success": False, "message": f"{HEADER} must be at most 255 characters."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        fingerprint = request_fingerprint(request)
+        IdempotencyKey.objects.filter(
+            user=request.user, key=key, created_at__lt=timezone.now() - get_ttl()
+        ).delete()
+
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    record = IdempotencyKey.objects.create(user=request.user, key=key, request_hash=fingerprint)
+            except IntegrityError:
+                record = None
+
+            if record is not None:
+                response = view_func(self, request, *args, **kwargs)
+                if response.status_code >= 500:
+                    transaction.set_rollback(True)
+                    return response
+                record.status_code = response.status_code
+                record.response_body = json.dumps(response.data, cls=JSONEncoder)
+                record.response_etag = response.get('ETag', '')
+                record.save(update_fields=['status_code', 'response_body', 'response_etag'])
+                return response
+
+        return replay(request, key, fingerprint)
+
+    return wrapper
+
+
+def replay(request, key, fingerprint):
+    try:
+        record = IdempotencyKey.objects.get(user=request.user, key=key)
+    except IdempotencyKey.DoesNotExist:
+        # The original request failed and was rolled back between our insert and lookup.
+        return Response({"success": False, "message": "The original request did not complete. Retry it."},
+                        status=status.HTTP_409_CONFLICT)
+
+    if record.request_hash != fingerprint:
+        return Response({"success": False, "message": f"{HEADER} was already used for a different request."},
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    response = Response(json.loads(record.response_body) if record.response_body else None,
+                        status=record.status_code)
+    if record.response_etag:
+        response['ETag'] = record.response_etag
+    response['Idempotent-Replayed'] = 'true'
+    return response
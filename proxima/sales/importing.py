@@ -0,0 +1,302 @@
+"""
+Streaming CSV import of clients and historical sale items.
+
+Rows are read one at a time and handled in batches of ``batch_size``, so memory
+use does not depend on file size. Each row goes through the same field rules
+as the API (``ClientSerializer`` / ``SaleItemSerializer``), with one serializer
+instance reused for the whole file. Bad rows go to the error report and are
+skipped; the rest are written per batch.
+
+``clients`` files: name, phone, address, attend_by, arc_name, arc_phone, arc_address.
+Clients are upserted by normalized phone (``Client.phone_key``), so formatting
+differences don't create duplicates. Only non-empty cells overwrite existing values,
+including those of an earlier row with the same phone in the file.
+
+``sale_items`` files: sale_ref, client_phone, client_name, status, created_at,
+plus SaleItem columns (room, category, product_name, product_code, size_finish,
+description, quantity, mrp, discount_type, discount_value). Consecutive rows
+with the same sale_ref become one sale, so rows must be grouped by sale_ref.
+Items also go through ``SaleItem.clean()`` (``bulk_create`` skips it) and the
+client columns through ``ClientSerializer``. created_at (ISO 8601 date or
+datetime) dates historical sales; without it they are dated at import time.
+Prices come from ``SaleItem.calculate_prices``.
+"""
+import csv
+from itertools import islice
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from . import events
+from .dedupe import phone_key
+from .models import Client, Sale, SaleItem
+from .serializers import ClientSerializer, SaleItemSerializer
+
+KINDS = ('clients', 'sale_items')
+CLIENT_FIELDS = ('name', 'phone', 'address', 'attend_by', 'arc_name', 'arc_phone', 'arc_address')
+ITEM_FIELDS = (
+    'room', 'category', 'product_name', 'product_code', 'size_finish', 'description',
+    'quantity', 'mrp', 'discount_type', 'discount_value',
+)
+SALE_FIELDS = ('sale_ref', 'client_phone', 'client_name', 'status', 'created_at')
+ERROR_SAMPLE_SIZE = 100
+
+
+class ImportReport:
+    """Running totals plus a streamed per-row error report (and a small sample for API responses)."""
+
+    def __init__(self, errors_file=None):
+        self.rows = 0
+        self.clients_created = 0
+        self.clients_updated = 0
+        self.sales_created = 0
+        self.items_created = 0
+        self.error_count = 0
+        self.errors = []
+        self.writer = csv.writer(errors_file) if errors_file is not None else None
+        if self.writer:
+            self.writer.writerow(['line', 'errors'])
+
+    def error(self, line, detail):
+        self.error_count += 1
+        if isinstance(detail, dict):
+            message = "; ".join(
+                f"{field}: {' '.join(str(m) for m in (messages if isinstance(messages, list) else [messages]))}"
+                for field, messages in detail.items()
+            )
+        else:
+            message = str(detail)
+        if len(self.errors) < ERROR_SAMPLE_SIZE:
+            self.errors.append({"line": line, "errors": message})
+        if self.writer:
+            self.writer.writerow([line, message])
+
+    def as_dict(self):
+        return {
+            "rows": self.rows,
+            "clients_created": self.clients_created,
+            "clients_updated": self.clients_updated,
+            "sales_created": self.sales_created,
+            "items_created": self.items_created,
+            "error_count": self.error_count,
+            "errors": self.errors,
+        }
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _pick(row, fields):
+    """Non-empty cells of the row, stripped. Empty cells are left out so model defaults apply
+    (and upserts keep the existing value); required names stay '' so validation reports them."""
+    values = {}
+    for field in fields:
+        value = (row.get(field) or '').strip()
+        if value:
+            values[field] = value
+        elif field in ('name', 'product_name'):
+            values[field] = ''
+    return values
+
+
+def _validate(serializer, data, line, report):
+    try:
+        return serializer.run_validation(data)
+    except ValidationError as exc:
+        report.error(line, exc.detail)
+        return None
+
+
+def _client_ids_by_phone_key(keys):
+    ids = {}
+    for client_id, key in Client.objects.filter(phone_key__in=keys).order_by('-id').values_list('id', 'phone_key'):
+        ids[key] = client_id  # oldest client wins when a phone is duplicated
+    return ids
+
+
+def _new_client(data, **extra):
+    client = Client(**data, **extra)
+    client.set_match_keys()  # bulk_create/bulk_update skip Client.save()
+    return client
+
+
+def _upsert_clients(rows, report):
+    by_phone_key = {}
+    without_phone = []
+    for data in rows:
+        key = phone_key(data.get('phone'))
+        if key:
+            # Rows repeating a phone fill in the same client; later non-empty cells win
+            by_phone_key.setdefault(key, {}).update(data)
+        else:
+            without_phone.append(data)
+
+    existing = _client_ids_by_phone_key(list(by_phone_key))
+    now = timezone.now()
+    to_update = {}
+    to_create = [_new_client(data) for data in without_phone]
+    for key, data in by_phone_key.items():
+        if key in existing:
+            fields = tuple(sorted({*data, 'phone_key', 'name_key', 'updated_at'}))
+            to_update.setdefault(fields, []).append(_new_client(data, id=existing[key], updated_at=now))
+        else:
+            to_create.append(_new_client(data))
+
+    Client.objects.bulk_create(to_create)
+    for fields, clients in to_update.items():
+        Client.objects.bulk_update(clients, list(fields))
+    report.clients_created += len(to_create)
+    report.clients_updated += sum(len(clients) for clients in to_update.values())
+
+
+def import_clients(reader, report, batch_size=1000):
+    serializer = ClientSerializer()
+    for chunk in _chunks(enumerate(reader, start=2), batch_size):
+        valid = []
+        for line, row in chunk:
+            report.rows += 1
+            data = _validate(serializer, _pick(row, CLIENT_FIELDS), line, report)
+            if data is not None:
+                valid.append(data)
+        with transaction.atomic():
+            _upsert_clients(valid, report)
+
+
+class _SaleGroups:
+    """Tracks the sale being filled by consecutive rows with the same sale_ref."""
+
+    def __init__(self, user):
+        self.user = user
+        self.ref = None
+        self.sale_id = None
+        self.created = set()
+
+    def starts(self, ref):
+        return ref != self.ref or self.sale_id is None
+
+    def sale_for(self, ref, sale_data, clients, report):
+        if not self.starts(ref):
+            return self.sale_id
+
+        phone = sale_data.get('client_phone')
+        key = phone_key(phone)
+        client_id = clients.get(key) if key else None
+        if phone and client_id is None:
+            client = Client.objects.create(name=sale_data.get('client_name') or phone, phone=phone)
+            client_id = client.id
+            if key:
+                clients[key] = client_id
+            report.clients_created += 1
+
+        sale = Sale.objects.create(created_by=self.user, client_id=client_id, status=sale_data.get('status') or 'draft')
+        if sale_data.get('created_at'):
+            # created_at is auto_now_add, so a historical date is set after the insert
+            Sale.objects.filter(pk=sale.pk).update(created_at=sale_data['created_at'])
+        report.sales_created += 1
+        self.created.add(sale.id)
+        self.ref, self.sale_id = ref, sale.id
+        return sale.id
+
+
+def _validate_sale(sale_data, line, report, client_serializer, date_field):
+    """Check the sale columns of a row that starts a new sale, before anything is written for it."""
+    errors = {}
+    phone = sale_data.get('client_phone')
+    if phone:
+        try:
+            client_serializer.run_validation({"name": sale_data.get('client_name') or phone, "phone": phone})
+        except ValidationError as exc:
+            errors.update({f"client_{field}": messages for field, messages in exc.detail.items()})
+    if sale_data.get('created_at'):
+        try:
+            sale_data['created_at'] = date_field.run_validation(sale_data['created_at'])
+        except ValidationError as exc:
+            errors['created_at'] = exc.detail
+    if errors:
+        report.error(line, errors)
+        return False
+    return True
+
+
+def _clean_item(item, line, report):
+    """Model rules (SaleItem.clean), with model defaults applied; bulk_create skips them."""
+    try:
+        item.clean()
+    except DjangoValidationError as exc:
+        report.error(line, exc.message_dict if hasattr(exc, 'error_dict') else exc.messages)
+        return False
+    return True
+
+
+def import_sale_items(reader, report, user, batch_size=1000):
+    serializer = SaleItemSerializer()
+    client_serializer = ClientSerializer()
+    date_field = serializers.DateTimeField()
+    statuses = {code for code, _ in Sale.STATUS_CHOICES}
+    groups = _SaleGroups(user)
+
+    for chunk in _chunks(enumerate(reader, start=2), batch_size):
+        keys = {phone_key(row.get('client_phone')) for _, row in chunk} - {None}
+        clients = _client_ids_by_phone_key(list(keys))
+        items = []
+
+        with transaction.atomic():
+            for line, row in chunk:
+                report.rows += 1
+                sale_data = _pick(row, SALE_FIELDS)
+                if not sale_data.get('sale_ref'):
+                    report.error(line, {"sale_ref": ["This field is required."]})
+                    continue
+                if sale_data.get('status') and sale_data['status'] not in statuses:
+                    report.error(line, {"status": [f"Must be one of: {', '.join(sorted(statuses))}."]})
+                    continue
+
+                if groups.starts(sale_data['sale_ref']) and not _validate_sale(
+                        sale_data, line, report, client_serializer, date_field):
+                    continue
+
+                data = _validate(serializer, _pick(row, ITEM_FIELDS), line, report)
+                if data is None:
+                    continue
+                item = SaleItem(**data)
+                if not _clean_item(item, line, report):
+                    continue
+
+                item.sale_id = groups.sale_for(sale_data['sale_ref'], sale_data, clients, report)
+                item.price_per_piece, item.total_amount = item.calculate_prices()
+                items.append(item)
+
+            SaleItem.objects.bulk_create(items)
+            report.items_created += len(items)
+            # Sales continued from the previous batch get more items; the others are new
+            events.publish_sales(groups.created, 'create')
+            events.publish_sales({item.sale_id for item in items} - groups.created)
+            groups.created = set()
+
+
+def run_import(kind, path, user=None, errors_path=None, batch_size=1000):
+    if kind not in KINDS:
+        raise ValueError(f"Unknown import kind '{kind}'.")
+
+    errors_file = open(errors_path, 'w', newline='', encoding='utf-8') if errors_path else None
+    try:
+        report = ImportReport(errors_file)
+        with open(path, newline='', encoding='utf-8-sig') as source:
+            reader = csv.DictReader(source)
+            if kind == 'clients':
+                import_clients(reader, report, batch_size)
+            else:
+                import_sale_items(reader, report, user, batch_size)
+    finally:
+        if errors_file is not None:
+            errors_file.close()
+    return report
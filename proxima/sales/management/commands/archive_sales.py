@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from sales.archive import archive_sales
+from sales.models import Sale
+
+
+class Command(BaseCommand):
+    help = "Move old and/or cancelled sales (and their items) into the archive tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, metavar='DAYS',
+                            help="Archive sales created more than DAYS days ago.")
+        parser.add_argument('--status', action='append', choices=[code for code, _ in Sale.STATUS_CHOICES],
+                            help="Archive sales with this status (repeatable).")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if options['older_than'] is None and not options['status']:
+            raise CommandError("Pass --older-than and/or --status.")
+
+        older_than = None
+        if options['older_than'] is not None:
+            older_than = timezone.now() - timedelta(days=options['older_than'])
+
+        total_sales = total_items = 0
+        for sales, items in archive_sales(older_than, options['status'], options['batch_size']):
+            total_sales += sales
+            total_items += items
+            self.stdout.write(f"Archived {total_sales} sale(s), {total_items} item(s)...")
+
+        self.stdout.write(self.style.SUCCESS(f"Archived {total_sales} sale(s) and {total_items} item(s)."))
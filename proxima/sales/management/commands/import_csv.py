@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from sales.importing import KINDS, run_import
+
+
+class Command(BaseCommand):
+    help = "Stream-import clients or historical sale items from a CSV file (see sales/importing.py for columns)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=KINDS)
+        parser.add_argument('path')
+        parser.add_argument('--user', help="Email of the user recorded as creator of imported sales.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--errors-file', help="Write the per-row error report to this CSV file.")
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            user = get_user_model().objects.filter(email=options['user']).first()
+            if user is None:
+                raise CommandError(f"No user with email {options['user']}.")
+        if options['kind'] == 'sale_items' and user is None:
+            raise CommandError("--user is required for sale_items imports.")
+
+        report = run_import(options['kind'], options['path'], user=user,
+                            errors_path=options['errors_file'], batch_size=options['batch_size'])
+
+        for error in report.errors[:20]:
+            self.stderr.write(f"line {error['line']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{report.rows} row(s): {report.clients_created} client(s) created, "
+            f"{report.clients_updated} client(s) updated, {report.sales_created} sale(s) created, "
+            f"{report.items_created} item(s) created, {report.error_count} error(s)."
+        ))
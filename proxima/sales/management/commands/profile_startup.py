@@ -0,0 +1,60 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter so nothing is already imported. Prints warmup timings as JSON on stdout.
+BOOT_SCRIPT = """
+import json, time
+started = time.perf_counter()
+import django
+django.setup()
+setup = time.perf_counter() - started
+started = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+app = time.perf_counter() - started
+from proxima.warmup import warmup
+timings = warmup(connect_db={connect_db})
+print(json.dumps(dict({{'django.setup': setup, 'get_wsgi_application': app}}, **timings)))
+"""
+
+
+class Command(BaseCommand):
+    help = "Boot the app in a fresh interpreter and report per-module import time and warmup step timings."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=30, help="Show the N slowest modules.")
+        parser.add_argument('--sort', choices=['cumulative', 'self'], default='cumulative')
+        parser.add_argument('--no-db', action='store_true', help="Skip opening database connections.")
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(p for p in sys.path if p), WARMUP_ON_IMPORT='False')
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', BOOT_SCRIPT.format(connect_db=not options['no_db'])],
+            env=env, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            raise CommandError(f"Startup failed:\n{proc.stderr[-4000:]}")
+
+        modules = []
+        for line in proc.stderr.splitlines():
+            # "import time:  self [us] | cumulative | imported package"
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            modules.append((name.rstrip(), int(self_us), int(cumulative_us)))
+
+        total_us = sum(self_us for _, self_us, _ in modules)
+        key = 1 if options['sort'] == 'self' else 2
+        self.stdout.write(f"{len(modules)} modules imported in {total_us / 1000:.1f} ms\n")
+        self.stdout.write(f"{'self ms':>9} {'cumul ms':>9}  module")
+        for name, self_us, cumulative_us in sorted(modules, key=lambda m: m[key], reverse=True)[:options['top']]:
+            self.stdout.write(f"{self_us / 1000:9.1f} {cumulative_us / 1000:9.1f}  {name}")
+
+        timings = json.loads(proc.stdout.strip().splitlines()[-1])
+        self.stdout.write("\nStartup phases:")
+        for phase, seconds in timings.items():
+            self.stdout.write(f"  {phase:<22} {seconds * 1000:8.1f} ms")
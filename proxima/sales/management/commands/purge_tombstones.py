@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from sales.deletion import purge
+from sales.models import Tombstone
+from sales.sync import get_settings
+
+
+class Command(BaseCommand):
+    help = "Delete sync tombstones older than SYNC['TOMBSTONE_TTL'] (devices that old must resync fully anyway)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - get_settings()['TOMBSTONE_TTL']
+        deleted = purge(Tombstone.objects.filter(deleted_at__lt=cutoff), options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired tombstone(s)."))
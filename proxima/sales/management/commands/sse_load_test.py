@@ -0,0 +1,178 @@
+import asyncio
+import resource
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from sales.events import FileBroker, get_broker
+
+PATH = '/api/sales/events/'
+
+
+class Command(BaseCommand):
+    help = (
+        "Open N idle subscribers on the sale event stream, publish a few events and report connect time, "
+        "delivery latency and memory. Runs against the ASGI app in this process, or a running server with --url "
+        "(events then reach it only through the FileBroker)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=int, default=1000)
+        parser.add_argument('--events', type=int, default=5, help="Events to publish once everyone is connected.")
+        parser.add_argument('--user', help="Email of the user to stream as (default: first active user).")
+        parser.add_argument('--url', help="Base URL of a running ASGI server, e.g. http://127.0.0.1:8000")
+        parser.add_argument('--timeout', type=float, default=60)
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.filter(is_active=True)
+        user = users.filter(email=options['user']).first() if options['user'] else users.order_by('id').first()
+        if user is None:
+            raise CommandError("No such user.")
+
+        self.token = str(AccessToken.for_user(user))
+        self.broker = get_broker()
+        if options['url'] and options['events'] and not isinstance(self.broker, FileBroker):
+            self.stderr.write("SALE_EVENTS uses an in-process broker; events can't reach --url, skipping them.")
+            options['events'] = 0
+
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        report = asyncio.run(self.run(options))
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        self.stdout.write(f"Subscribers connected: {report['connected']}/{options['subscribers']} "
+                          f"in {report['connect_seconds']:.2f}s (status codes: {report['statuses']})")
+        if report['latencies']:
+            latencies = sorted(report['latencies'])
+            self.stdout.write(
+                f"Deliveries: {len(latencies)}/{options['subscribers'] * options['events']}, latency "
+                f"p50 {statistics.median(latencies) * 1000:.1f}ms, "
+                f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f}ms, max {latencies[-1] * 1000:.1f}ms"
+            )
+        if not options['url']:
+            self.stdout.write(f"Peak RSS growth: {(rss_after - rss_before) / 1024:.1f}MB; "
+                              f"subscribers left after disconnect: {len(self.broker.subscribers)}")
+
+    async def run(self, options):
+        clients = [_Subscriber() for _ in range(options['subscribers'])]
+        connect = self.connect_url if options['url'] else self.connect_asgi
+        started = time.perf_counter()
+        tasks = [asyncio.create_task(connect(client, options)) for client in clients]
+        await _wait_for(lambda: all(client.ready.is_set() or client.done for client in clients), options['timeout'])
+        connect_seconds = time.perf_counter() - started
+
+        sent = {}
+        for number in range(options['events']):
+            sent[number] = time.perf_counter()
+            await asyncio.to_thread(self.broker.publish, None, {"load_test": number})
+            await asyncio.sleep(0.05)
+        await _wait_for(lambda: all(len(client.received) >= len(sent) for client in clients if client.ready.is_set()),
+                        options['timeout'])
+
+        for client in clients:
+            client.disconnect.set()
+        await asyncio.wait(tasks, timeout=options['timeout'])
+        for task in tasks:
+            task.cancel()
+
+        statuses = {}
+        for client in clients:
+            statuses[client.status] = statuses.get(client.status, 0) + 1
+        return {
+            "connected": sum(client.ready.is_set() for client in clients),
+            "connect_seconds": connect_seconds,
+            "statuses": statuses,
+            "latencies": [at - sent[number] for client in clients for number, at in client.received.items()
+                          if number in sent],
+        }
+
+    async def connect_asgi(self, client, options):
+        from proxima.asgi import application
+
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': PATH, 'raw_path': PATH.encode(), 'query_string': b'', 'root_path': '',
+            'headers': [(b'host', b'testserver'), (b'authorization', f'Bearer {self.token}'.encode())],
+            'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+        }
+        request_sent = False
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await client.disconnect.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                client.status = message['status']
+            elif message['type'] == 'http.response.body':
+                client.feed(message.get('body', b''))
+
+        try:
+            await application(scope, receive, send)
+        finally:
+            client.done = True
+
+    async def connect_url(self, client, options):
+        url = urlsplit(options['url'])
+        try:
+            reader, writer = await asyncio.open_connection(url.hostname, url.port or 80)
+        except OSError:
+            client.done = True
+            return
+        writer.write(
+            f"GET {url.path.rstrip('/')}{PATH} HTTP/1.1\r\nHost: {url.netloc}\r\n"
+            f"Authorization: Bearer {self.token}\r\nAccept: text/event-stream\r\n\r\n".encode()
+        )
+        await writer.drain()
+        try:
+            status_line = await reader.readline()
+            client.status = int(status_line.split()[1]) if status_line else None
+            while not client.disconnect.is_set():
+                read = asyncio.create_task(reader.read(4096))
+                closed = asyncio.create_task(client.disconnect.wait())
+                done, _ = await asyncio.wait({read, closed}, return_when=asyncio.FIRST_COMPLETED)
+                closed.cancel()
+                if read not in done:
+                    read.cancel()
+                    break
+                chunk = read.result()
+                if not chunk:
+                    break
+                client.feed(chunk)
+        finally:
+            client.done = True
+            writer.close()
+
+
+class _Subscriber:
+    def __init__(self):
+        self.ready = asyncio.Event()
+        self.disconnect = asyncio.Event()
+        self.received = {}
+        self.status = None
+        self.done = False
+        self.pending = b''
+
+    def feed(self, chunk):
+        self.pending += chunk
+        *frames, self.pending = self.pending.split(b'\n\n')
+        for frame in frames:
+            if b'retry:' in frame:
+                self.ready.set()
+            marker = frame.find(b'"load_test": ')
+            if marker != -1:
+                number = int(frame[marker + 13:].split(b'}')[0])
+                self.received.setdefault(number, time.perf_counter())
+
+
+async def _wait_for(condition, timeout):
+    deadline = time.perf_counter() + timeout
+    while not condition() and time.perf_counter() < deadline:
+        await asyncio.sleep(0.05)
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.5 on 2026-10-19 02:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0006_sale_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedSale',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('draft', 'Draft'), ('confirmed', 'Confirmed'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('client', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='sales.client')),
+                ('created_by', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedSaleItem',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('room', models.CharField(blank=True, max_length=100, null=True)),
+                ('category', models.CharField(choices=[('Hardware', 'Hardware'), ('Lamination & Highlighter', 'Lamination & Highlighter'), ('Veneer', 'Veneer'), ('Sofa_durtains', 'Sofa & Curtains'), ('Modular', 'Modular')], max_length=50)),
+                ('product_name', models.CharField(max_length=255)),
+                ('product_code', models.CharField(blank=True, max_length=100, null=True)),
+                ('size_finish', models.CharField(blank=True, max_length=100, null=True)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('quantity', models.PositiveIntegerField(default=1)),
+                ('mrp', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('discount_type', models.CharField(choices=[('percent', 'Percent'), ('amount', 'Amount')], default='amount', max_length=10)),
+                ('discount_value', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('price_per_piece', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('sale', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='items', to='sales.archivedsale')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedsale',
+            index=models.Index(fields=['client', 'created_at'], name='archsale_client_created_idx'),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.5 on 2026-10-19 02:37
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# Frozen copies of sales.dedupe.phone_key / name_key as of this migration, so later
+# changes to the live normalisation don't change what this backfill does.
+_TITLES = {'mr', 'mrs', 'ms', 'miss', 'dr', 'shri', 'smt', 'sri'}
+
+
+def phone_key(phone):
+    digits = re.sub(r'\D', '', phone or '')
+    if len(digits) < 6:
+        return None
+    return digits[-10:]
+
+
+def name_key(name):
+    text = unicodedata.normalize('NFKD', name or '')
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    words = [word for word in re.sub(r'[^\w\s]', ' ', text).split() if word not in _TITLES]
+    return ' '.join(sorted(words))[:255] or None
+
+
+def fill_match_keys(apps, schema_editor):
+    Client = apps.get_model('sales', 'Client')
+    batch = []
+    for client in Client.objects.only('id', 'name', 'phone').iterator(chunk_size=2000):
+        client.phone_key, client.name_key = phone_key(client.phone), name_key(client.name)
+        batch.append(client)
+        if len(batch) == 2000:
+            Client.objects.bulk_update(batch, ['phone_key', 'name_key'])
+            batch = []
+    if batch:
+        Client.objects.bulk_update(batch, ['phone_key', 'name_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0010_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='name_key',
+            field=models.CharField(blank=True, editable=False, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='phone_key',
+            field=models.CharField(blank=True, editable=False, max_length=20, null=True),
+        ),
+        migrations.AlterField(
+            model_name='historyentry',
+            name='action',
+            field=models.CharField(choices=[('create', 'Create'), ('update', 'Update'), ('delete', 'Delete'), ('merge', 'Merge')], max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['phone_key'], name='client_phone_key_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['name_key'], name='client_name_key_idx'),
+        ),
+        migrations.RunPython(fill_match_keys, migrations.RunPython.noop),
+    ]
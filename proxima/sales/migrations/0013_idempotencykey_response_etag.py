@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 03:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0012_sync_updated_at_and_tombstones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='idempotencykey',
+            name='response_etag',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -1,7 +1,10 @@
 from decimal import Decimal, ROUND_HALF_UP
 from django.db import models
+from django.utils import timezone
+from django.core.serializers.json import DjangoJSONEncoder
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
+from . import audit, dedupe
 
 class Client(models.Model):
     name = models.CharField(max_length=255)
@@ -12,6 +15,30 @@ class Client(models.Model):
     arc_phone = models.CharField(max_length=20, blank=True, null=True)
     arc_address = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Normalized phone/name used to spot duplicates (see sales.dedupe); set on save
+    phone_key = models.CharField(max_length=20, blank=True, null=True, editable=False)
+    name_key = models.CharField(max_length=255, blank=True, null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['phone'], name='client_phone_idx'),
+            models.Index(fields=['name'], name='client_name_idx'),
+            models.Index(fields=['phone_key'], name='client_phone_key_idx'),
+            models.Index(fields=['name_key'], name='client_name_key_idx'),
+            models.Index(fields=['updated_at', 'id'], name='client_updated_idx'),
+        ]
+
+    def set_match_keys(self):
+        keys = dedupe.match_keys(self.name, self.phone)
+        self.phone_key, self.name_key = keys['phone_key'], keys['name_key']
+
+    def save(self, *args, **kwargs):
+        self.set_match_keys()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'name', 'phone'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'phone_key', 'name_key'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name or f"Client {self.id}"
@@ -26,6 +53,17 @@ class Sale(models.Model):
     client = models.ForeignKey(Client, on_delete=models.CASCADE, null=True, blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="draft")
     created_at = models.DateTimeField(auto_now_add=True)
+    version = models.PositiveIntegerField(default=1)
+    # Set by save() and by every QuerySet.update() of sales; /api/sync/ pages on (updated_at, id)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='sale_status_created_idx'),
+            models.Index(fields=['client', 'created_at'], name='sale_client_created_idx'),
+            models.Index(fields=['created_at'], name='sale_created_idx'),
+            models.Index(fields=['updated_at', 'id'], name='sale_updated_idx'),
+        ]
 
     @property
     def total_amount(self):
@@ -34,6 +72,22 @@ class Sale(models.Model):
             total += (item.total_amount or Decimal('0.00'))
         return total.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
 
+    def update_if_version(self, expected_version, **fields):
+        """
+        Optimistic write: UPDATE ... WHERE id = ? AND version = ?, bumping the version.
+        Returns False when another writer got there first; no row lock is held beyond the statement.
+        """
+        updated = Sale.objects.filter(pk=self.pk, version=expected_version).update(
+            version=models.F('version') + 1, updated_at=timezone.now(), **fields
+        )
+        if not updated:
+            return False
+        audit.record(self, 'update', audit.diff(audit.snapshot(self, fields), audit.raw_values(Sale, fields)))
+        for attr, value in fields.items():
+            setattr(self, attr, value)
+        self.version = expected_version + 1
+        return True
+
     def __str__(self):
         return f"Sale #{self.id} ({self.status})"
 
@@ -62,7 +116,16 @@ class SaleItem(models.Model):
     discount_value = models.DecimalField(max_digits=12, decimal_places=2, default=0, validators=[MinValueValidator(Decimal('0.00'))])
     price_per_piece = models.DecimalField(max_digits=12, decimal_places=2, default=0, validators=[MinValueValidator(Decimal('0.00'))])
     total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0, validators=[MinValueValidator(Decimal('0.00'))])
+    updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['sale', 'room'], name='saleitem_sale_room_idx'),
+            models.Index(fields=['sale', 'category'], name='saleitem_sale_category_idx'),
+            models.Index(fields=['category'], name='saleitem_category_idx'),
+            models.Index(fields=['product_name'], name='saleitem_product_name_idx'),
+            models.Index(fields=['updated_at', 'id'], name='saleitem_updated_idx'),
+        ]
 
     def clean(self):
         from django.core.exceptions import ValidationError
@@ -104,4 +167,122 @@ class SaleItem(models.Model):
         super().save(*args, **kwargs)
 
     def __str__(self):
-        return f"{self.product_name} x{self.quantity} (Sale {self.sale_id})"
\ No newline at end of file
+        return f"{self.product_name} x{self.quantity} (Sale {self.sale_id})"
+
+class IdempotencyKey(models.Model):
+    """
+    Stored outcome of a request sent with an ``Idempotency-Key`` header.
+    Retries with the same key replay ``response_body`` (and ``response_etag``) instead of re-running the view.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.TextField(blank=True, default='')
+    response_etag = models.CharField(max_length=64, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='idempotency_user_key_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.key} ({self.status_code})"
+
+
+class ArchivedSale(models.Model):
+    """
+    Cold copy of a Sale moved out by ``manage.py archive_sales``. Keeps the original id.
+    Relations are not enforced by the database so archived rows never block deletes.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    client = models.ForeignKey(Client, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+')
+    status = models.CharField(max_length=20, choices=Sale.STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    version = models.PositiveIntegerField(default=1)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['client', 'created_at'], name='archsale_client_created_idx'),
+        ]
+
+    @property
+    def total_amount(self):
+        total = Decimal('0.00')
+        for item in self.items.all():
+            total += (item.total_amount or Decimal('0.00'))
+        return total.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+    def __str__(self):
+        return f"Archived sale #{self.id} ({self.status})"
+
+
+class ArchivedSaleItem(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    sale = models.ForeignKey(ArchivedSale, related_name="items", on_delete=models.DO_NOTHING, db_constraint=False)
+    room = models.CharField(max_length=100, blank=True, null=True)
+    category = models.CharField(max_length=50, choices=SaleItem.CATEGORY_CHOICES)
+    product_name = models.CharField(max_length=255)
+    product_code = models.CharField(max_length=100, blank=True, null=True)
+    size_finish = models.CharField(max_length=100, blank=True, null=True)
+    description = models.TextField(blank=True, null=True)
+    quantity = models.PositiveIntegerField(default=1)
+    mrp = models.DecimalField(max_digits=12, decimal_places=2)
+    discount_type = models.CharField(max_length=10, choices=SaleItem.DISCOUNT_TYPE_CHOICES, default="amount")
+    discount_value = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    price_per_piece = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.product_name} x{self.quantity} (Archived sale {self.sale_id})"
+
+
+
+class HistoryEntry(models.Model):
+    """
+    Append-only field-level change log for sales, sale items and clients.
+    Written in one bulk insert per request by ``sales.audit.AuditMiddleware``.
+    """
+    ACTION_CHOICES = [
+        ("create", "Create"),
+        ("update", "Update"),
+        ("delete", "Delete"),
+        ("merge", "Merge"),
+    ]
+    model = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    sale_id = models.BigIntegerField(null=True, blank=True)
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    changes = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, db_constraint=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['sale_id', '-id'], name='history_sale_idx'),
+            models.Index(fields=['model', 'object_id'], name='history_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.action} {self.model} #{self.object_id}"
+
+
+class Tombstone(models.Model):
+    """
+    Left behind when a client, sale or sale item is deleted (or archived), so /api/sync/
+    can tell offline devices to drop it. Purged by ``manage.py purge_tombstones``.
+    """
+    model = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['deleted_at', 'id'], name='tombstone_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model} #{self.object_id} deleted"
@@ -0,0 +1,222 @@
+"""
+Pure-Python quotation PDF renderer.
+
+Works on plain dicts/strings only (no Django imports) so it can run inside a
+process pool. Uses the standard Helvetica fonts, which every PDF viewer ships,
+so nothing has to be embedded. The page template and font metrics are built
+once per process and reused for every quote.
+"""
+from functools import lru_cache
+
+PAGE_WIDTH = 595   # A4, points
+PAGE_HEIGHT = 842
+MARGIN = 36
+LINE = 14
+
+# Advance widths (1/1000 em) for characters 32..126, from the Adobe AFM files
+_HELVETICA_WIDTHS = (
+    "278 278 355 556 556 889 667 191 333 333 389 584 278 333 278 278 "
+    "556 556 556 556 556 556 556 556 556 556 278 278 584 584 584 556 "
+    "1015 667 667 722 722 667 611 778 722 278 500 667 556 833 722 778 "
+    "667 778 722 667 611 722 667 944 667 667 611 278 278 278 469 556 "
+    "333 556 556 500 556 556 278 556 556 222 222 500 222 833 556 556 "
+    "556 556 333 500 278 556 500 722 500 500 500 334 260 334 584"
+)
+_HELVETICA_BOLD_WIDTHS = (
+    "278 333 474 556 556 889 722 238 333 333 389 584 278 333 278 278 "
+    "556 556 556 556 556 556 556 556 556 556 333 333 584 584 584 611 "
+    "975 722 722 722 722 667 611 778 722 278 556 722 611 833 722 778 "
+    "667 778 722 667 611 722 667 944 667 667 611 333 278 333 584 556 "
+    "333 556 611 556 611 556 333 611 611 278 278 556 278 889 611 611 "
+    "611 611 389 556 333 611 556 778 556 556 500 389 280 389 584"
+)
+
+# (key, heading, x, width, align)
+_COLUMNS = (
+    ("no", "#", MARGIN, 22, "left"),
+    ("product", "Product", MARGIN + 22, 175, "left"),
+    ("category", "Category", MARGIN + 197, 80, "left"),
+    ("quantity", "Qty", MARGIN + 277, 30, "right"),
+    ("mrp", "MRP", MARGIN + 307, 60, "right"),
+    ("discount", "Discount", MARGIN + 367, 55, "right"),
+    ("price_per_piece", "Rate", MARGIN + 422, 55, "right"),
+    ("total_amount", "Amount", MARGIN + 477, 46, "right"),
+)
+
+
+@lru_cache(maxsize=None)
+def font_widths(bold=False):
+    widths = _HELVETICA_BOLD_WIDTHS if bold else _HELVETICA_WIDTHS
+    return {chr(32 + i): int(w) for i, w in enumerate(widths.split())}
+
+
+def text_width(text, size, bold=False):
+    widths = font_widths(bold)
+    return sum(widths.get(ch, 556) for ch in text) * size / 1000
+
+
+def fit(text, width, size, bold=False):
+    """Truncate text with '...' so it fits in ``width`` points."""
+    if text_width(text, size, bold) <= width:
+        return text
+    while text and text_width(text + "...", size, bold) > width:
+        text = text[:-1]
+    return text + "..."
+
+
+def _escape(text):
+    text = text.encode("cp1252", "replace").decode("cp1252")
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _aligned_x(x, text, size, bold, align, width):
+    if align == "right":
+        return x + width - text_width(text, size, bold)
+    return x
+
+
+def _text(x, y, text, size=9, bold=False, align="left", width=0):
+    x = _aligned_x(x, text, size, bold, align, width)
+    font = "F2" if bold else "F1"
+    return f"BT /{font} {size} Tf {x:.2f} {y:.2f} Td ({_escape(text)}) Tj ET"
+
+
+def _rule(y, x1=MARGIN, x2=PAGE_WIDTH - MARGIN):
+    return f"{x1} {y:.2f} m {x2} {y:.2f} l S"
+
+
+@lru_cache(maxsize=None)
+def page_template():
+    """Static drawing operators shared by every page: the fonts dict and the table header."""
+    fonts = (
+        "<< /F1 << /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >> "
+        "/F2 << /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >> >>"
+    )
+    header = tuple(
+        (_aligned_x(x, heading, 8, True, align, width), _escape(heading))
+        for _, heading, x, width, align in _COLUMNS
+    )
+    return {"fonts": fonts, "table_header": header}
+
+
+class _Pages:
+    def __init__(self):
+        self.pages = []
+        self.new_page()
+
+    def new_page(self):
+        self.ops = ["0.5 w"]
+        self.pages.append(self.ops)
+        self.y = PAGE_HEIGHT - MARGIN
+
+    def ensure(self, height, table=False):
+        if self.y - height < MARGIN + LINE:
+            self.new_page()
+            if table:
+                self.table_header()
+
+    def table_header(self):
+        self.y -= LINE
+        for x, heading in page_template()["table_header"]:
+            self.ops.append(f"BT /F2 8 Tf {x:.2f} {self.y:.2f} Td ({heading}) Tj ET")
+        self.ops.append(_rule(self.y - 4))
+        self.y -= 4
+
+
+def _party(pages, x, heading, lines):
+    y = pages.y
+    pages.ops.append(_text(x, y, heading, 10, True))
+    for line in lines:
+        if line:
+            y -= LINE - 2
+            pages.ops.append(_text(x, y, fit(line, 250, 9), 9))
+    return y
+
+
+def render_quote(quote):
+    """
+    Render a quote dict (see ``sales.quotes.quote_data``) to PDF bytes.
+    """
+    pages = _Pages()
+    ops = pages.ops
+
+    ops.append(_text(MARGIN, pages.y - 8, "QUOTATION", 18, True))
+    right = PAGE_WIDTH - MARGIN
+    for offset, line in enumerate((f"Quote #{quote['id']}", quote["date"], quote["status"].title())):
+        ops.append(_text(right - 200, pages.y - offset * LINE, line, 9, offset == 0, "right", 200))
+    pages.y -= 3 * LINE + 6
+    ops.append(_rule(pages.y))
+    pages.y -= LINE + 2
+
+    client = quote["client"] or {}
+    bottom_left = _party(pages, MARGIN, "Client", [
+        client.get("name"), client.get("phone"), client.get("address"),
+        f"Attended by: {client['attend_by']}" if client.get("attend_by") else None,
+    ])
+    bottom_right = _party(pages, PAGE_WIDTH / 2, "Architect", [
+        client.get("arc_name") or "-", client.get("arc_phone"), client.get("arc_address"),
+    ])
+    pages.y = min(bottom_left, bottom_right) - LINE
+
+    number = 0
+    for room in quote["rooms"]:
+        pages.ensure(4 * LINE)
+        pages.y -= LINE
+        pages.ops.append(_text(MARGIN, pages.y, room["room"] or "General", 11, True))
+        pages.table_header()
+
+        for item in room["items"]:
+            number += 1
+            pages.ensure(LINE, table=True)
+            pages.y -= LINE
+            row = dict(item, no=str(number))
+            for key, _, x, width, align in _COLUMNS:
+                value = fit(row[key] or "", width - 4, 8)
+                pages.ops.append(_text(x, pages.y, value, 8, False, align, width))
+
+        pages.ensure(LINE, table=True)
+        pages.y -= LINE + 2
+        pages.ops.append(_rule(pages.y + 10, PAGE_WIDTH / 2, right))
+        pages.ops.append(_text(right - 240, pages.y, f"{room['room'] or 'General'} subtotal: Rs. {room['subtotal']}",
+                               9, True, "right", 240))
+
+    pages.ensure(2 * LINE)
+    pages.y -= 2 * LINE
+    pages.ops.append(_rule(pages.y + LINE - 2))
+    pages.ops.append(_text(right - 240, pages.y, f"Total: Rs. {quote['total_amount']}", 12, True, "right", 240))
+
+    total_pages = len(pages.pages)
+    for index, page_ops in enumerate(pages.pages, start=1):
+        page_ops.append(_text(right - 100, MARGIN / 2, f"Page {index} of {total_pages}", 8, False, "right", 100))
+
+    return _build_pdf([" \n".join(page_ops) for page_ops in pages.pages])
+
+
+def _build_pdf(contents):
+    template = page_template()
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None]
+    kids = []
+    for content in contents:
+        stream = content.encode("cp1252", "replace")
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n".encode("ascii") + stream + b"\nendstream")
+        content_ref = len(objects)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font {template['fonts']} >> /Contents {content_ref} 0 R >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        body = obj if isinstance(obj, bytes) else obj.encode("ascii")
+        out += f"{number} 0 obj\n".encode("ascii") + body + b"\nendobj\n"
+
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("ascii")
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode("ascii")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("ascii")
+    return bytes(out)
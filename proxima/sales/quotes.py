@@ -0,0 +1,127 @@
+import atexit
+import hashlib
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from .exceptions import QuoteRenderTimeout, QuoteRenderUnavailable
+from .quote_pdf import render_quote
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: request workers may be threaded and hold DB connections
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.QUOTE_PDF['POOL_WORKERS'],
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+            atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+        return _pool
+
+
+def _discard_pool(pool):
+    """A worker died (OOM, crash), which breaks the executor for good: drop it so the next call starts a new one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _render_in_pool(data):
+    timeout = settings.QUOTE_PDF['RENDER_TIMEOUT']
+    for attempt in range(2):
+        pool = _get_pool()
+        try:
+            return pool.submit(render_quote, data).result(timeout=timeout)
+        except BrokenProcessPool:
+            _discard_pool(pool)
+        except TimeoutError:
+            raise QuoteRenderTimeout()
+    # Broke twice in a row: most likely this quote kills the worker, so don't keep retrying it
+    raise QuoteRenderUnavailable()
+
+
+def _clean(value):
+    # Flatten multi-line addresses etc. to a single PDF text line
+    return " ".join(str(value).split()) if value is not None else None
+
+
+def quote_data(sale):
+    """Plain, picklable snapshot of a sale for the renderer: items grouped by room."""
+    client = sale.client
+    client_fields = ('name', 'phone', 'address', 'attend_by', 'arc_name', 'arc_phone', 'arc_address')
+
+    rooms = {}
+    for item in sale.items.order_by('room', 'category', 'id'):
+        room = rooms.setdefault(item.room, {"room": _clean(item.room), "subtotal": 0, "items": []})
+        room["subtotal"] += item.total_amount
+        if item.discount_type == 'percent':
+            discount = f"{item.discount_value}%"
+        else:
+            discount = f"{item.discount_value}"
+        details = [_clean(item.product_name), _clean(item.product_code), _clean(item.size_finish)]
+        room["items"].append({
+            "product": " / ".join(part for part in details if part),
+            "category": item.get_category_display(),
+            "quantity": str(item.quantity),
+            "mrp": f"{item.mrp:.2f}",
+            "discount": discount,
+            "price_per_piece": f"{item.price_per_piece:.2f}",
+            "total_amount": f"{item.total_amount:.2f}",
+        })
+
+    total = sum(room["subtotal"] for room in rooms.values())
+    for room in rooms.values():
+        room["subtotal"] = f"{room['subtotal']:.2f}"
+
+    return {
+        "id": sale.id,
+        "status": sale.status,
+        "date": sale.created_at.strftime('%d %b %Y'),
+        "client": {field: _clean(getattr(client, field)) for field in client_fields} if client else None,
+        "rooms": list(rooms.values()),
+        "total_amount": f"{total:.2f}",
+        "item_count": sum(len(room["items"]) for room in rooms.values()),
+    }
+
+
+def cache_key(sale):
+    """
+    Rendered PDFs are keyed by sale version, plus what can change without bumping it:
+    client details, and items written directly (admin, SaleItem.save()), seen through
+    their count and latest updated_at.
+    """
+    client = sale.client
+    client_state = repr([getattr(client, f.attname) for f in client._meta.concrete_fields]) if client else ''
+    items = sale.items.order_by().aggregate(count=Count('id'), updated=Max('updated_at'))
+    state = f"{client_state}|{items['count']}|{items['updated'].isoformat() if items['updated'] else ''}"
+    digest = hashlib.sha1(state.encode('utf-8')).hexdigest()[:12]
+    return f"quote-pdf:{sale.id}:{sale.version}:{digest}"
+
+
+def render_quote_pdf(sale):
+    key = cache_key(sale)
+    pdf = cache.get(key)
+    if pdf is not None:
+        return pdf
+
+    data = quote_data(sale)
+    if settings.QUOTE_PDF['POOL_WORKERS'] and data["item_count"] >= settings.QUOTE_PDF['POOL_MIN_ITEMS']:
+        pdf = _render_in_pool(data)
+    else:
+        # Small quotes render faster in-process than the round trip to the pool
+        pdf = render_quote(data)
+
+    cache.set(key, pdf, settings.QUOTE_PDF['CACHE_TIMEOUT'])
+    return pdf
@@ -1,6 +1,9 @@
 from rest_framework import serializers
 from decimal import Decimal
-from .models import Client, Sale, SaleItem
+from django.db import transaction
+from .models import Client, Sale, SaleItem, ArchivedSale, ArchivedSaleItem, HistoryEntry, Tombstone
+from .exceptions import SaleVersionConflict
+from . import audit, sync
 
 class SaleItemSerializer(serializers.ModelSerializer):
     class Meta:
@@ -44,13 +47,38 @@ class SaleItemSerializer(serializers.ModelSerializer):
 class ClientSerializer(serializers.ModelSerializer):
     class Meta:
         model = Client
-        fields = '__all__'
+        exclude = ('phone_key', 'name_key')
 
     def validate_name(self, value):
         if not value or not value.strip():
             raise serializers.ValidationError("Client name is required.")
         return value.strip()
+
+    def create(self, validated_data):
+        client = super().create(validated_data)
+        audit.record_create(client, sale_id=self.context.get('sale_id'))
+        return client
+
+    def update(self, instance, validated_data):
+        before = audit.snapshot(instance)
+        client = super().update(instance, validated_data)
+        audit.record(client, 'update', audit.diff(before, audit.snapshot(client)), sale_id=self.context.get('sale_id'))
+        return client
     
+def replace_items(sale, items_data):
+    """Swap a sale's items for new ones, recording the deletes and creates in the history."""
+    # Delete existing items
+    old_items = list(sale.items.all())
+    for item in old_items:
+        audit.record_delete(item)
+    doomed = SaleItem.objects.filter(id__in=[item.id for item in old_items])
+    sync.record_deletes(doomed)
+    doomed.delete()
+    # Create new items
+    for item_data in items_data:
+        audit.record_create(SaleItem.objects.create(sale=sale, **item_data))
+
+
 class SaleSerializer(serializers.ModelSerializer):
     items = SaleItemSerializer(many=True, required=False)
     total_amount = serializers.DecimalField(max_digits=14, decimal_places=2, read_only=True,)
@@ -62,8 +90,8 @@ class SaleSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Sale
-        fields = ['id', 'created_by', 'client', 'status', 'created_at', 'items', 'total_amount', 'client_id']
-        read_only_fields = ['created_by', 'created_at', 'total_amount']
+        fields = ['id', 'created_by', 'client', 'status', 'created_at', 'items', 'total_amount', 'client_id', 'version']
+        read_only_fields = ['created_by', 'created_at', 'total_amount', 'version']
 
     def create(self, validated_data):
         request = self.context.get('request')
@@ -73,29 +101,27 @@ class SaleSerializer(serializers.ModelSerializer):
         validated_data.pop('created_by', None)
 
         sale = Sale.objects.create(created_by=user, **validated_data)
+        audit.record_create(sale)
         
         # Create sale items if provided
         for item_data in items_data:
-            SaleItem.objects.create(sale=sale, **item_data)
+            audit.record_create(SaleItem.objects.create(sale=sale, **item_data))
         
         return sale
 
     def update(self, instance, validated_data):
         items_data = validated_data.pop('items', None)
-        
-        # Update sale fields
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
-        
-        # Update items if provided
-        if items_data is not None:
-            # Delete existing items
-            instance.items.all().delete()
-            # Create new items
-            for item_data in items_data:
-                SaleItem.objects.create(sale=instance, **item_data)
-        
+        expected_version = validated_data.pop('expected_version', instance.version)
+
+        with transaction.atomic():
+            # Update sale fields only if nobody else changed the sale since it was read
+            if not instance.update_if_version(expected_version, **validated_data):
+                raise SaleVersionConflict()
+
+            # Update items if provided
+            if items_data is not None:
+                replace_items(instance, items_data)
+
         return instance
 
 class SaleWithClientUpdateSerializer(serializers.ModelSerializer):
@@ -114,46 +140,91 @@ class SaleWithClientUpdateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Sale
-        fields = ['id', 'created_by', 'client', 'status', 'created_at', 'items', 'total_amount', 'client_id', 'client_data']
-        read_only_fields = ['created_by', 'created_at', 'total_amount']
+        fields = ['id', 'created_by', 'client', 'status', 'created_at', 'items', 'total_amount', 'client_id', 'client_data', 'version']
+        read_only_fields = ['created_by', 'created_at', 'total_amount', 'version']
 
     def update(self, instance, validated_data):
         # Extract client data and items data
         client_data = validated_data.pop('client_data', None)
         items_data = validated_data.pop('items', None)
         client_id = validated_data.pop('client_id', None)
-        
-        # Update sale fields (status, etc.)
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        
-        # Handle client assignment/update
-        if client_id:
-            # Assign existing client
-            instance.client = client_id
-        
-        if client_data:
-            print(client_data)
-            # Update or create client
-            if instance.client:
-                # Update existing client
-                client_serializer = ClientSerializer(instance.client, data=client_data, partial=True)
-                client_serializer.is_valid(raise_exception=True)
-                client_serializer.save()
-            else:
-                # Create new client
-                client_serializer = ClientSerializer(data=client_data)
-                client_serializer.is_valid(raise_exception=True)
-                instance.client = client_serializer.save()
-        
-        # Update items if items data is provided
-        if items_data is not None:
-            # Delete existing items
-            instance.items.all().delete()
-            # Create new items
-            for item_data in items_data:
-                SaleItem.objects.create(sale=instance, **item_data)
-        
-        instance.save()
+        expected_version = validated_data.pop('expected_version', instance.version)
+
+        with transaction.atomic():
+            # Sale fields (status, etc.)
+            fields = dict(validated_data)
+
+            # Handle client assignment/update
+            if client_id:
+                # Assign existing client
+                fields['client'] = client_id
+
+            client = fields.get('client', instance.client)
+            if client_data:
+                # Update or create client
+                if client:
+                    # Update existing client
+                    client_serializer = ClientSerializer(client, data=client_data, partial=True, context={'sale_id': instance.id})
+                    client_serializer.is_valid(raise_exception=True)
+                    client_serializer.save()
+                else:
+                    # Create new client
+                    client_serializer = ClientSerializer(data=client_data, context={'sale_id': instance.id})
+                    client_serializer.is_valid(raise_exception=True)
+                    fields['client'] = client_serializer.save()
+
+            if not instance.update_if_version(expected_version, **fields):
+                raise SaleVersionConflict()
+
+            # Update items if items data is provided
+            if items_data is not None:
+                replace_items(instance, items_data)
+
         return instance
 
+
+class ArchivedSaleItemSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ArchivedSaleItem
+        fields = '__all__'
+
+
+class ArchivedSaleSerializer(serializers.ModelSerializer):
+    """Read-only view of an archived sale in the same shape as SaleSerializer."""
+    items = ArchivedSaleItemSerializer(many=True, read_only=True)
+    total_amount = serializers.DecimalField(max_digits=14, decimal_places=2, read_only=True)
+    created_by = serializers.StringRelatedField(read_only=True)
+    client = ClientSerializer(read_only=True)
+    archived = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ArchivedSale
+        fields = ['id', 'created_by', 'client', 'status', 'created_at', 'items', 'total_amount', 'version', 'archived', 'archived_at']
+        read_only_fields = fields
+
+    def get_archived(self, obj):
+        return True
+
+
+class HistoryEntrySerializer(serializers.ModelSerializer):
+    user = serializers.StringRelatedField(read_only=True)
+
+    class Meta:
+        model = HistoryEntry
+        fields = ['id', 'model', 'object_id', 'action', 'changes', 'user', 'created_at']
+
+
+class SyncSaleSerializer(serializers.ModelSerializer):
+    """Flat sale row for /api/sync/: items and the client come in their own lists."""
+
+    class Meta:
+        model = Sale
+        fields = ['id', 'created_by', 'client', 'status', 'created_at', 'updated_at', 'version']
+
+
+class TombstoneSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='object_id')
+
+    class Meta:
+        model = Tombstone
+        fields = ['model', 'id', 'deleted_at']
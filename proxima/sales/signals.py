@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Sent by sales.audit once a batch of HistoryEntry rows has been written, i.e. after the
+# changes they describe were committed. Keyword argument: entries (list of HistoryEntry).
+changes_committed = Signal()
@@ -0,0 +1,86 @@
+"""
+ASGI serving of the sale event streams, mounted in front of Django in proxima/asgi.py.
+
+Django's ASGI handler keeps a thread per request for the sync parts of the
+middleware chain, and for a stream that thread lives as long as the client
+stays connected. ``SaleEventsHandler`` serves the ``sale-events`` routes with
+only CORS handling in front of an async view, so an idle subscriber is just a
+coroutine waiting on its queue. Every other request goes to Django as usual;
+under WSGI ``sales.views.SaleEventsView`` answers these URLs with 501.
+"""
+from asgiref.sync import sync_to_async
+from corsheaders.middleware import CorsMiddleware
+from django.core.handlers.asgi import ASGIHandler
+from django.http import JsonResponse, StreamingHttpResponse
+from django.urls import Resolver404, resolve
+from rest_framework.exceptions import APIException
+
+from . import events
+
+ROUTE_NAMES = ('sale-events', 'sale-detail-events')
+
+
+def _authenticate(request, pk):
+    """(user, None) or (None, error response). Runs on Django's sync thread (DB access)."""
+    from .models import Sale
+    from .views import EventStreamAuthentication
+
+    try:
+        result = EventStreamAuthentication().authenticate(request)
+    except APIException as exc:
+        detail = exc.detail.get('detail', exc.detail) if isinstance(exc.detail, dict) else exc.detail
+        return None, JsonResponse({"success": False, "message": str(detail)}, status=exc.status_code)
+    if result is None:
+        return None, JsonResponse({"success": False, "message": "Authentication credentials were not provided."},
+                                  status=401)
+    if pk is not None and not Sale.objects.filter(pk=pk).exists():
+        return None, JsonResponse({"success": False, "message": "Sale not found."}, status=404)
+    return result[0], None
+
+
+class SaleEventsHandler(ASGIHandler):
+
+    def load_middleware(self, is_async=False):
+        self._middleware_chain = CorsMiddleware(self.respond)
+
+    async def __call__(self, scope, receive, send):
+        # Skips Django's per-request ThreadSensitiveContext: short sync calls (auth, request signals)
+        # share Django's one sync thread instead of pinning a thread for the life of the stream
+        await self.handle(scope, receive, send)
+
+    async def respond(self, request):
+        if request.method != 'GET':
+            return JsonResponse({"success": False, "message": f'Method "{request.method}" not allowed.'}, status=405)
+
+        pk = request.resolver_match.kwargs.get('pk')
+        user, error = await sync_to_async(_authenticate)(request, pk)
+        if error is not None:
+            return error
+
+        last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+        response = StreamingHttpResponse(events.stream(pk, last_event_id), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def run_get_response(self, request):
+        request.resolver_match = resolve(request.path_info)
+        return await super().run_get_response(request)
+
+
+def with_sale_events(application):
+    """Wrap Django's ASGI application so sale event streams go to ``SaleEventsHandler``."""
+    events_handler = SaleEventsHandler()
+
+    async def app(scope, receive, send):
+        path = scope.get('path', '')
+        if scope['type'] == 'http' and path.endswith('/events/'):
+            try:
+                match = resolve(path.removeprefix(scope.get('root_path', '')))
+            except Resolver404:
+                match = None
+            if match is not None and match.url_name in ROUTE_NAMES:
+                return await events_handler(scope, receive, send)
+        return await application(scope, receive, send)
+
+    return app
@@ -0,0 +1,155 @@
+"""
+Delta sync for offline devices (``GET /api/sync/?since=<cursor>``).
+
+Clients, sales and sale items are read in ``(updated_at, id)`` order from their
+``updated_at`` indexes, and deletions from ``Tombstone`` rows in
+``(deleted_at, id)`` order. Each of the four streams keeps its own position in
+the opaque cursor, so every page is at most ``page_size`` rows per stream and
+a reconnect reads only what changed since the last cursor.
+
+Rows changed in the last ``SYNC['SETTLE_SECONDS']`` are left for the next call.
+A transaction that commits after later ones (its timestamps are older than
+rows already handed out) is then still picked up, as long as it commits
+within that window.
+
+Deletes that go through ``QuerySet.delete()`` or raw SQL must call
+``record_deletes()`` first; transactions that can outlast ``SETTLE_SECONDS``
+wrap their deletes in ``dated_at_commit()``. Every ``QuerySet.update()`` of these models must
+set ``updated_at``.
+"""
+import base64
+import binascii
+import json
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import CharField, DateTimeField, Q, Value
+from django.utils import timezone
+
+from .models import Client, Sale, SaleItem, Tombstone
+
+STREAMS = {
+    'clients': (Client, 'updated_at'),
+    'sales': (Sale, 'updated_at'),
+    'sale_items': (SaleItem, 'updated_at'),
+    'deleted': (Tombstone, 'deleted_at'),
+}
+
+
+# Timestamp for tombstones recorded inside dated_at_commit()
+_stamp = ContextVar('tombstone_stamp', default=None)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def get_settings():
+    defaults = {'PAGE_SIZE': 500, 'MAX_PAGE_SIZE': 2000, 'SETTLE_SECONDS': 5, 'TOMBSTONE_TTL': timedelta(days=30)}
+    return dict(defaults, **getattr(settings, 'SYNC', {}))
+
+
+def encode_cursor(positions):
+    data = {name: [at.isoformat(), pk] for name, (at, pk) in positions.items()}
+    return base64.urlsafe_b64encode(json.dumps(data, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        positions = {name: (datetime.fromisoformat(data[name][0]), int(data[name][1])) for name in STREAMS}
+    except (ValueError, TypeError, KeyError, IndexError, binascii.Error) as exc:
+        raise InvalidCursor("Invalid sync cursor.") from exc
+    if any(at.tzinfo is None for at, _ in positions.values()):
+        raise InvalidCursor("Invalid sync cursor.")
+    return positions
+
+
+def _after(queryset, field, position, horizon):
+    at, pk = position
+    return (
+        queryset.filter(Q(**{f'{field}__gt': at}) | Q(**{field: at, 'id__gt': pk}), **{f'{field}__lte': horizon})
+        .order_by(field, 'id')
+    )
+
+
+def changes(cursor=None, page_size=None):
+    """
+    One page of changes after ``cursor`` (None: a full download).
+    Returns {stream: [rows]}, the next cursor, whether more pages follow, and whether
+    the device must discard its data and download everything again (cursor too old).
+    """
+    options = get_settings()
+    page_size = min(page_size or options['PAGE_SIZE'], options['MAX_PAGE_SIZE'])
+    now = timezone.now()
+    horizon = now - timedelta(seconds=options['SETTLE_SECONDS'])
+
+    if cursor is None:
+        start = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+        positions = {name: (start, 0) for name in STREAMS}
+        # A fresh download has nothing to delete yet; only deletions from now on matter
+        positions['deleted'] = (horizon, 0)
+    else:
+        positions = decode_cursor(cursor)
+        if positions['deleted'][0] < now - options['TOMBSTONE_TTL']:
+            return {'reset': True, 'rows': {}, 'cursor': None, 'has_more': False}
+
+    rows = {}
+    has_more = False
+    for name, (model, field) in STREAMS.items():
+        page = list(_after(model.objects.all(), field, positions[name], horizon)[:page_size])
+        if page:
+            positions[name] = (getattr(page[-1], field), page[-1].id)
+        if name == 'deleted' and len(page) < page_size:
+            # Every deletion up to the horizon has been handed out; this also dates the cursor for TOMBSTONE_TTL
+            positions[name] = max(positions[name], (horizon, 0))
+        has_more = has_more or len(page) == page_size
+        rows[name] = page
+
+    return {'reset': False, 'rows': rows, 'cursor': encode_cursor(positions), 'has_more': has_more}
+
+
+@contextmanager
+def dated_at_commit():
+    """
+    Use inside a long transaction that deletes rows (client deletion, archiving):
+    tombstones recorded in the block get one timestamp, taken when the block ends,
+    just before the commit. A device syncing while the transaction runs moves its
+    cursor past the time the rows were deleted; dated at commit, the tombstones
+    still come after that cursor.
+    """
+    stamp = timezone.now()
+    token = _stamp.set(stamp)
+    try:
+        yield
+    finally:
+        _stamp.reset(token)
+    Tombstone.objects.filter(deleted_at=stamp).update(deleted_at=timezone.now())
+
+
+def record_deletes(queryset, cascade=False):
+    """
+    Tombstone every row of ``queryset`` with one INSERT ... SELECT; call before deleting them.
+    With ``cascade``, also the sales of deleted clients and the items of deleted sales.
+    """
+    model = queryset.model
+    if cascade and model is Client:
+        record_deletes(Sale.objects.filter(client_id__in=queryset.values('id')), cascade=True)
+    elif cascade and model is Sale:
+        record_deletes(SaleItem.objects.filter(sale_id__in=queryset.values('id')))
+
+    rows = queryset.order_by().annotate(
+        tombstone_model=Value(model._meta.model_name, output_field=CharField()),
+        tombstone_at=Value(_stamp.get() or timezone.now(), output_field=DateTimeField()),
+    ).values_list('id', 'tombstone_model', 'tombstone_at')
+    sql, params = rows.query.sql_with_params()
+
+    connection = connections[queryset.db]
+    qn = connection.ops.quote_name
+    columns = ', '.join(qn(column) for column in ('object_id', 'model', 'deleted_at'))
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {qn(Tombstone._meta.db_table)} ({columns}) {sql}", params)
+        return cursor.rowcount
@@ -0,0 +1,68 @@
+import os
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from jobs.queue import task
+from . import audit, deletion, importing
+from .models import Sale, SaleItem
+
+PRICE_FIELDS = ('price_per_piece', 'total_amount')
+
+
+@task('sales.recalculate_totals')
+def recalculate_totals(sale_ids=None, batch_size=1000):
+    """
+    Recompute price_per_piece/total_amount for items (all, or of the given sales) in batches.
+    Only items whose prices change are written; they get a history entry and their sales a new version.
+    """
+    items = SaleItem.objects.order_by('id')
+    if sale_ids:
+        items = items.filter(sale_id__in=sale_ids)
+
+    updated = 0
+    last_id = 0
+    while True:
+        batch = list(items.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            break
+        last_id = batch[-1].id
+        now = timezone.now()
+        changed = []
+        with audit.collect(), transaction.atomic():
+            for item in batch:
+                before = audit.snapshot(item, PRICE_FIELDS)
+                item.price_per_piece, item.total_amount = item.calculate_prices()
+                changes = audit.diff(before, audit.snapshot(item, PRICE_FIELDS))
+                if changes:
+                    item.updated_at = now
+                    changed.append(item)
+                    audit.record(item, 'update', changes)
+            if changed:
+                SaleItem.objects.bulk_update(changed, [*PRICE_FIELDS, 'updated_at'])
+                # Totals changed: ETags and version-keyed quote PDFs must not be served stale
+                Sale.objects.filter(id__in={item.sale_id for item in changed}).update(
+                    version=F('version') + 1, updated_at=now
+                )
+        updated += len(changed)
+
+    return {"updated_items": updated}
+
+
+@task('sales.delete_client')
+def delete_client(client_id):
+    total, counts = deletion.delete_client(client_id)
+    return {"deleted": total, "counts": counts}
+
+
+@task('sales.import_csv')
+def import_csv(kind, path, user_id, errors_path):
+    user = get_user_model().objects.filter(id=user_id).first()
+    try:
+        report = importing.run_import(kind, path, user=user, errors_path=errors_path)
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+    return report.as_dict()
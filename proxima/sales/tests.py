@@ -1,3 +1,450 @@
-from django.test import TestCase
+import base64
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from proxima import throttling
+from . import sync
+from .coalescing import flights
+from .deletion import delete_sales
+from .importing import run_import
+from .models import ArchivedSale, Client, HistoryEntry, IdempotencyKey, Sale, SaleItem, Tombstone
+from .views import ClientViewSet
+
+
+class SaleOptimisticConcurrencyTests(TransactionTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='rep@example.com', password='secret')
+        self.sale = Sale.objects.create(created_by=self.user)
+
+    def test_parallel_writers_only_one_wins(self):
+        writers = 8
+        barrier = threading.Barrier(writers)
+        results = []
+
+        def write(status):
+            try:
+                sale = Sale.objects.get(pk=self.sale.pk)
+                barrier.wait()
+                results.append(sale.update_if_version(1, status=status))
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=write, args=('confirmed' if i % 2 else 'cancelled',))
+            for i in range(writers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results.count(True), 1)
+        self.assertEqual(results.count(False), writers - 1)
+        self.assertEqual(Sale.objects.get(pk=self.sale.pk).version, 2)
+
+    def test_stale_if_match_returns_conflict(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = f'/api/sales/{self.sale.pk}/'
+
+        response = client.get(url)
+        etag = response['ETag']
+
+        response = client.patch(url, {'status': 'confirmed'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        response = client.patch(url, {'status': 'cancelled'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Sale.objects.get(pk=self.sale.pk).status, 'confirmed')
+
+
+class IdempotencyKeyTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='rep@example.com', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_sale(self, key, body):
+        return self.client.post('/api/sales/', body, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_stored_response(self):
+        first = self.create_sale('retry-1', {'status': 'draft'})
+        self.assertEqual(first.status_code, 201)
+
+        second = self.create_sale('retry-1', {'status': 'draft'})
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(Sale.objects.count(), 1)
+
+    def test_replay_keeps_the_etag(self):
+        sale = Sale.objects.create(created_by=self.user)
+        first, second = [
+            self.client.post(f'/api/sales/{sale.id}/cancel/', format='json', HTTP_IDEMPOTENCY_KEY='cancel-1')
+            for _ in range(2)
+        ]
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first['ETag'], '"2"')
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_same_key_with_different_body_is_rejected(self):
+        self.create_sale('retry-2', {'status': 'draft'})
+
+        response = self.create_sale('retry-2', {'status': 'confirmed'})
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Sale.objects.count(), 1)
+
+    def test_keys_are_per_user(self):
+        self.create_sale('shared', {'status': 'draft'})
+        other = User.objects.create_user(email='other@example.com', password='secret')
+        self.client.force_authenticate(other)
+
+        response = self.create_sale('shared', {'status': 'draft'})
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(Sale.objects.count(), 2)
+        self.assertEqual(IdempotencyKey.objects.count(), 2)
+
+
+@override_settings(SYNC={'PAGE_SIZE': 2, 'MAX_PAGE_SIZE': 10, 'SETTLE_SECONDS': 0, 'TOMBSTONE_TTL': timedelta(days=30)})
+class SyncChangesTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='rep@example.com', password='secret')
+
+    def download(self, cursor=None):
+        """Follow has_more to the end; returns ({stream: [ids]}, final cursor)."""
+        ids = {name: [] for name in sync.STREAMS}
+        while True:
+            result = sync.changes(cursor)
+            self.assertFalse(result['reset'])
+            for name, rows in result['rows'].items():
+                ids[name] += [row.object_id if name == 'deleted' else row.id for row in rows]
+            cursor = result['cursor']
+            if not result['has_more']:
+                return ids, cursor
+
+    def test_pages_through_rows_with_equal_timestamps(self):
+        clients = [Client.objects.create(name=f"Client {n}") for n in range(5)]
+        Client.objects.update(updated_at=timezone.now() - timedelta(minutes=1))
+
+        ids, _ = self.download()
+        self.assertEqual(ids['clients'], [client.id for client in clients])
+
+    def test_only_changes_after_the_cursor_are_returned(self):
+        first = Client.objects.create(name="First")
+        _, cursor = self.download()
+
+        first.name = "First, renamed"
+        first.save()
+        second = Client.objects.create(name="Second")
+        ids, _ = self.download(cursor)
+        self.assertEqual(ids['clients'], [first.id, second.id])
+
+    def test_deletions_come_back_as_tombstones(self):
+        sale = Sale.objects.create(created_by=self.user)
+        item = SaleItem.objects.create(sale=sale, category='Hardware', product_name='Hinge', mrp='10.00')
+        ids, cursor = self.download()
+        self.assertEqual((ids['sales'], ids['sale_items'], ids['deleted']), ([sale.id], [item.id], []))
+
+        delete_sales([sale.id])
+        ids, _ = self.download(cursor)
+        self.assertEqual(sorted(ids['deleted']), sorted([sale.id, item.id]))
+        self.assertEqual(ids['sales'], [])
+
+    def test_tombstones_of_a_long_transaction_are_dated_at_commit(self):
+        sale = Sale.objects.create(created_by=self.user)
+        _, cursor = self.download()
+
+        with transaction.atomic(), sync.dated_at_commit():
+            sync.record_deletes(Sale.objects.filter(pk=sale.pk))
+            Sale.objects.filter(pk=sale.pk).delete()
+            # Meanwhile a device syncs; it can't see the uncommitted tombstone but its cursor moves on
+            positions = sync.decode_cursor(cursor)
+            positions['deleted'] = (timezone.now(), 0)
+            cursor = sync.encode_cursor(positions)
+
+        ids, _ = self.download(cursor)
+        self.assertEqual(ids['deleted'], [sale.id])
+
+    def test_cursor_older_than_tombstone_ttl_resets(self):
+        long_ago = timezone.now() - timedelta(days=31)
+        cursor = sync.encode_cursor({name: (long_ago, 0) for name in sync.STREAMS})
+
+        self.assertTrue(sync.changes(cursor)['reset'])
+
+    def test_invalid_cursor_and_page_size_are_rejected(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        self.assertEqual(client.get('/api/sync/', {'since': 'not-a-cursor'}).status_code, 400)
+        naive = base64.urlsafe_b64encode(json.dumps({name: ["2026-10-01T00:00:00", 0] for name in sync.STREAMS}).encode())
+        self.assertEqual(client.get('/api/sync/', {'since': naive.decode()}).status_code, 400)
+        self.assertEqual(client.get('/api/sync/', {'page_size': '-1'}).status_code, 400)
+        self.assertEqual(client.get('/api/sync/', {'page_size': '3'}).status_code, 200)
+
+
+class SaleCloneTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='rep@example.com', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.sale = Sale.objects.create(created_by=self.user)
+        for room, name in (('Kitchen', 'Hinge'), ('Bedroom', 'Handle'), (None, 'Screws')):
+            SaleItem.objects.create(sale=self.sale, room=room, category='Hardware', product_name=name, mrp='10.00')
+
+    def clone(self, body):
+        return self.client.post(f'/api/sales/{self.sale.id}/clone/', body, format='json')
+
+    def cloned_items(self, response):
+        self.assertEqual(response.status_code, 201)
+        sale_id = response.json()['data']['id']
+        return sorted(SaleItem.objects.filter(sale_id=sale_id).values_list('product_name', flat=True))
+
+    def test_rooms_select_the_items_copied(self):
+        self.assertEqual(self.cloned_items(self.clone({})), ['Handle', 'Hinge', 'Screws'])
+        self.assertEqual(self.cloned_items(self.clone({'rooms': None})), ['Handle', 'Hinge', 'Screws'])
+        self.assertEqual(self.cloned_items(self.clone({'rooms': []})), [])
+        self.assertEqual(self.cloned_items(self.clone({'rooms': [None]})), ['Screws'])
+        self.assertEqual(self.cloned_items(self.clone({'rooms': ['Kitchen']})), ['Hinge'])
+        self.assertEqual(self.cloned_items(self.clone({'rooms': ['Kitchen', None]})), ['Hinge', 'Screws'])
+
+    def test_rooms_must_be_a_list_of_names(self):
+        for rooms in ('Kitchen', [{'a': 1}], [1]):
+            self.assertEqual(self.clone({'rooms': rooms}).status_code, 400)
+        self.assertEqual(Sale.objects.count(), 1)
+
+
+class CsvImportTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='rep@example.com', password='secret')
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def run_import(self, kind, lines, **kwargs):
+        path = os.path.join(self.directory, f'{kind}.csv')
+        with open(path, 'w', encoding='utf-8') as source:
+            source.write('\n'.join(lines) + '\n')
+        return run_import(kind, path, **kwargs)
+
+    def test_clients_are_upserted_by_phone(self):
+        existing = Client.objects.create(name="Asha", phone="98765 43210", address="Old Street")
+        report = self.run_import('clients', [
+            'name,phone,address,attend_by',
+            'Asha K,+91 98765-43210,,Ravi',
+            'Bina,5550001,Market Road,',
+            'Bina B,555 0001,,Ravi',
+            ',5550002,,',
+        ], batch_size=2)
+
+        self.assertEqual((report.rows, report.clients_created, report.clients_updated), (4, 1, 2))
+        self.assertEqual(report.errors, [{"line": 5, "errors": "name: This field may not be blank."}])
+        existing.refresh_from_db()
+        self.assertEqual((existing.name, existing.address, existing.attend_by), ("Asha K", "Old Street", "Ravi"))
+        bina = Client.objects.get(phone_key='5550001')
+        self.assertEqual((bina.name, bina.address, bina.attend_by), ("Bina B", "Market Road", "Ravi"))
+
+    def test_repeated_phones_in_one_batch_fill_one_client(self):
+        report = self.run_import('clients', [
+            'name,phone,address,attend_by',
+            'Chirag,5550003,Lake View,',
+            'Chirag S,555-0003,,Ravi',
+        ])
+
+        self.assertEqual((report.clients_created, report.error_count), (1, 0))
+        client = Client.objects.get()
+        self.assertEqual((client.name, client.address, client.attend_by), ("Chirag S", "Lake View", "Ravi"))
+
+    def test_sale_items_are_grouped_into_sales(self):
+        report = self.run_import('sale_items', [
+            'sale_ref,client_phone,client_name,status,created_at,room,category,product_name,quantity,mrp',
+            'A,5550004,Dev,confirmed,2025-01-15,Kitchen,Hardware,Hinge,2,10',
+            'A,5550004,Dev,confirmed,2025-01-15,Kitchen,Hardware,Handle,1,5',
+            'B,,,,,,Veneer,,1,5',
+            'C,,,shipped,,,Hardware,Hinge,1,5',
+            'D,,,,yesterday,,Hardware,Hinge,1,5',
+            'E,,,,,,Hardware,Hinge,1,5',
+        ], user=self.user)
+
+        self.assertEqual(
+            (report.rows, report.clients_created, report.sales_created, report.items_created, report.error_count),
+            (6, 1, 2, 3, 3),
+        )
+        self.assertEqual([error['line'] for error in report.errors], [4, 5, 6])
+        first = Sale.objects.get(items__product_name='Handle')
+        self.assertEqual((first.status, first.client.name, first.created_at.date().isoformat()),
+                         ('confirmed', 'Dev', '2025-01-15'))
+        self.assertEqual(first.items.count(), 2)
+        self.assertEqual(Sale.objects.exclude(pk=first.pk).get().items.count(), 1)
+
+
+class ClientMergeTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='rep@example.com', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_merge_repoints_sales_and_tombstones_the_merged_clients(self):
+        target = Client.objects.create(name="Asha", phone="9876543210")
+        first = Client.objects.create(name="Asha K", phone="+91 98765 43210", address="Lake View")
+        second = Client.objects.create(name="A. K.", arc_name="Studio Nine")
+        sales = [Sale.objects.create(created_by=self.user, client=client) for client in (first, first, second)]
+        ArchivedSale.objects.create(id=sales[-1].id + 100, created_by=self.user, client=second, status='confirmed',
+                                    created_at=timezone.now())
+
+        response = self.client.post(f'/api/clients/{target.id}/merge/',
+                                    {'client_ids': [first.id, second.id]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual((data['merged'], data['sales'], data['archived_sales']), (2, 3, 1))
+
+        self.assertEqual(set(Client.objects.values_list('id', flat=True)), {target.id})
+        self.assertEqual(Sale.objects.filter(client=target).count(), 3)
+        self.assertEqual(set(Sale.objects.values_list('version', flat=True)), {2})
+        self.assertEqual(ArchivedSale.objects.get().client_id, target.id)
+        target.refresh_from_db()
+        self.assertEqual((target.address, target.arc_name), ("Lake View", "Studio Nine"))
+        self.assertEqual(
+            sorted(Tombstone.objects.values_list('model', 'object_id')),
+            [('client', first.id), ('client', second.id)],
+        )
+
+    def test_merge_into_itself_is_rejected(self):
+        target = Client.objects.create(name="Asha")
+
+        response = self.client.post(f'/api/clients/{target.id}/merge/', {'client_ids': [target.id]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Tombstone.objects.exists())
+
+
+@override_settings(REST_FRAMEWORK=dict(
+    settings.REST_FRAMEWORK, TOKEN_BUCKET_STORE={'BACKEND': 'proxima.throttling.LocalMemoryStore'},
+))
+class LoginThrottleTests(TestCase):
+
+    def setUp(self):
+        # The store is built once per process; give each test a fresh one from the overridden settings
+        throttling.get_store.cache_clear()
+        self.addCleanup(throttling.get_store.cache_clear)
+        User.objects.create_user(email='rep@example.com', password='secret')
+
+    def login(self, password):
+        return APIClient().post('/api/accounts/login/', {'email': 'rep@example.com', 'password': password},
+                                format='json')
+
+    def test_login_burst_is_throttled_with_retry_after(self):
+        capacity, refill_rate = throttling.parse_rate(settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']['login'])
+        for _ in range(capacity):
+            self.assertNotEqual(self.login('wrong').status_code, 429)
+
+        response = self.login('secret')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.json()['success'], False)
+        self.assertTrue(0 < int(response['Retry-After']) <= 1 / refill_rate + 1)
+
+
+class RequestCoalescingTests(TransactionTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='rep@example.com', password='secret')
+        Client.objects.create(name="Asha")
+        flights.metrics.reset()
+        self.addCleanup(flights.metrics.reset)
+
+    def requests_seen(self):
+        return flights.metrics.snapshot().get('ClientViewSet.list', {}).get('requests', 0)
+
+    def test_concurrent_identical_gets_share_one_run(self):
+        readers = 6
+        get_queryset = ClientViewSet.get_queryset
+        responses = []
+
+        def slow_get_queryset(view):
+            # Hold the leader until every other request has arrived and is waiting on it
+            deadline = time.monotonic() + 5
+            while self.requests_seen() < readers and time.monotonic() < deadline:
+                time.sleep(0.01)
+            return get_queryset(view)
+
+        def read():
+            try:
+                client = APIClient()
+                client.force_authenticate(self.user)
+                responses.append(client.get('/api/clients/'))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=read) for _ in range(readers)]
+        with mock.patch.object(ClientViewSet, 'get_queryset', slow_get_queryset):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual([response.status_code for response in responses], [200] * readers)
+        self.assertEqual(len({response.content for response in responses}), 1)
+        self.assertEqual(
+            flights.metrics.snapshot()['ClientViewSet.list'],
+            {'requests': readers, 'leaders': 1, 'coalesced': readers - 1, 'fallbacks': 0},
+        )
+
+    @override_settings(REQUEST_COALESCING={'ENABLED': False})
+    def test_disabled_coalescing_records_nothing(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        self.assertEqual(client.get('/api/clients/').status_code, 200)
+        self.assertEqual(flights.metrics.snapshot(), {})
+
+
+class AuditMiddlewareTests(TransactionTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='rep@example.com', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.sale = Sale.objects.create(created_by=self.user)
+
+    def history_inserts(self, queries):
+        table = HistoryEntry._meta.db_table
+        return [query for query in queries if query['sql'].startswith('INSERT') and table in query['sql']]
+
+    def test_one_history_insert_per_request(self):
+        items = [{'category': 'Hardware', 'product_name': name, 'mrp': '10.00'} for name in ('Hinge', 'Handle', 'Lock')]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(f'/api/sales/{self.sale.id}/add_items/', {'items': items}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(len(self.history_inserts(queries.captured_queries)), 1)
+        entries = HistoryEntry.objects.filter(sale_id=self.sale.id, action='create', model='saleitem')
+        self.assertEqual(entries.count(), 3)
+        self.assertEqual(set(entries.values_list('user_id', flat=True)), {self.user.id})
+
+    def test_failed_request_writes_no_history(self):
+        items = [{'category': 'Hardware', 'product_name': 'Hinge', 'mrp': '10.00'}, {'category': 'Hardware'}]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(f'/api/sales/{self.sale.id}/add_items/', {'items': items}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        self.assertEqual(self.history_inserts(queries.captured_queries), [])
+        self.assertFalse(HistoryEntry.objects.filter(sale_id=self.sale.id).exists())
@@ -1,14 +1,21 @@
 # sales/urls.py
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ClientViewSet, SaleViewSet, SaleItemChoicesView, SaleItemListView
+from .views import ClientViewSet, SaleViewSet, SaleItemChoicesView, SaleItemListView, SaleQuotePDFView, SaleEventsView, SyncView, CSVImportView, CSVImportErrorsView, CoalescingStatsView
 
 router = DefaultRouter()
 router.register('clients', ClientViewSet, basename='client')
 router.register('sales', SaleViewSet, basename='sale')
 
 urlpatterns = [
+    path('sales/<int:pk>/quote.pdf', SaleQuotePDFView.as_view(), name='sale-quote-pdf'),
+    path('sales/events/', SaleEventsView.as_view(), name='sale-events'),
+    path('sales/<int:pk>/events/', SaleEventsView.as_view(), name='sale-detail-events'),
     path('', include(router.urls)),
     path('choices/', SaleItemChoicesView.as_view(), name='sale-item-choices'),
     path('sale-items/', SaleItemListView.as_view(), name='sale-items-list'),
+    path('sync/', SyncView.as_view(), name='sync'),
+    path('import/<str:kind>/', CSVImportView.as_view(), name='csv-import'),
+    path('import/jobs/<int:job_id>/errors/', CSVImportErrorsView.as_view(), name='csv-import-errors'),
+    path('coalescing/stats/', CoalescingStatsView.as_view(), name='coalescing-stats'),
 ]
\ No newline at end of file
@@ -1,17 +1,69 @@
+import os
+import uuid
+from decimal import Decimal
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from .models import Client, Sale, SaleItem
-from .serializers import ClientSerializer, SaleSerializer, SaleItemSerializer, SaleWithClientUpdateSerializer
+from .models import Client, Sale, SaleItem, ArchivedSale, HistoryEntry
+from .serializers import ClientSerializer, SaleSerializer, SaleItemSerializer, SaleWithClientUpdateSerializer, ArchivedSaleSerializer, HistoryEntrySerializer, SyncSaleSerializer, TombstoneSerializer
 from rest_framework.views import APIView
-from django.db.models import Q
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import IsAdminUser
+from rest_framework.exceptions import ValidationError
+from django.conf import settings
+from django.db import transaction
+from django.http import FileResponse, Http404, HttpResponse
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from django.db.models import Q, Sum, Count
 from .pagination import CustomPagination
+from .idempotency import idempotent
+from .coalescing import coalesced
+from .exceptions import SaleVersionConflict
+from jobs.models import Job
+from jobs.queue import enqueue
+from jobs.views import accepted_response
+from .quotes import render_quote_pdf
+from .deletion import delete_client, delete_sales
+from . import audit
+from .cloning import clone_sale
+from .importing import KINDS as IMPORT_KINDS
+from . import coalescing, dedupe, sync
+
+
+def get_expected_version(request, sale):
+    """
+    Version the client last saw: an If-Match header (ETag) or a "version" field in the body.
+    Falls back to the version just read, which still catches writers racing this request.
+    """
+    value = request.headers.get('If-Match')
+    if value:
+        value = value.strip()
+        if value == '*':
+            return sale.version
+        if value.startswith('W/'):
+            value = value[2:]
+        value = value.strip('"')
+    elif isinstance(request.data, dict) and request.data.get('version') is not None:
+        value = request.data.get('version')
+    else:
+        return sale.version
+
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValidationError({"success": False, "message": "If-Match/version must be a sale version number."})
+
+
+def with_etag(response, sale):
+    response['ETag'] = f'"{sale.version}"'
+    return response
 
 
 class ClientViewSet(viewsets.ModelViewSet):
     queryset = Client.objects.all().order_by('-created_at')
     serializer_class = ClientSerializer
     pagination_class = CustomPagination 
+    lookup_value_regex = r'\d+'
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -25,6 +77,7 @@ class ClientViewSet(viewsets.ModelViewSet):
             )
         return queryset
     
+    @coalesced(per_user=False)
     def list(self, request, *args, **kwargs):
         queryset = self.get_queryset()
 
@@ -44,21 +97,111 @@ class ClientViewSet(viewsets.ModelViewSet):
             "message": "Clients retrieved successfully.",
             "data": serializer.data
         })
+
+    @coalesced(per_user=False)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
     
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        # Looked up before saving so the new client doesn't match itself
+        matches = dedupe.suggest_matches(serializer.validated_data.get('name'), serializer.validated_data.get('phone'))
+        self.perform_create(serializer)
+        data = dict(serializer.data, possible_duplicates=ClientSerializer(matches, many=True).data)
+        return Response(data, status=status.HTTP_201_CREATED, headers=self.get_success_headers(serializer.data))
+
+    @action(detail=False, methods=['get'])
+    def matches(self, request):
+        """Existing clients with the same normalized phone or name, e.g. while a client form is being filled in."""
+        name = request.query_params.get('name')
+        phone = request.query_params.get('phone')
+        if not name and not phone:
+            return Response({"success": False, "message": "Provide name or phone."}, status=status.HTTP_400_BAD_REQUEST)
+
+        matches = dedupe.suggest_matches(name, phone)
+        return Response({
+            "success": True,
+            "message": "Matching clients retrieved successfully.",
+            "data": ClientSerializer(matches, many=True).data
+        })
+
+    @action(detail=False, methods=['get'])
+    def duplicates(self, request):
+        """Groups of clients sharing a normalized phone (?by=phone, default) or name (?by=name)."""
+        by = request.query_params.get('by', 'phone')
+        if by not in dedupe.KEY_FIELDS:
+            return Response({"success": False, "message": "by must be 'phone' or 'name'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        paginator = CustomPagination()
+        page = paginator.paginate_queryset(dedupe.duplicate_keys(by), request, view=self)
+        groups = [
+            {"key": group['key'], "clients": ClientSerializer(group['clients'], many=True).data}
+            for group in dedupe.duplicate_groups(page, by)
+        ]
+        response = paginator.get_paginated_response(groups)
+        return Response({
+            "success": True,
+            "message": "Duplicate clients retrieved successfully.",
+            "data": response.data
+        })
+
+    @action(detail=True, methods=['post'])
+    @idempotent
+    def merge(self, request, pk=None):
+        """
+        Merge other clients into this one. Pass client_ids: [ids]. Their sales move to this
+        client, blank fields here are filled from them, and they are deleted.
+        """
+        client = self.get_object()
+        client_ids = request.data.get('client_ids')
+        if not client_ids or not isinstance(client_ids, list):
+            return Response({"success": False, "message": "Provide a list of client IDs."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            client_ids = {int(client_id) for client_id in client_ids}
+        except (TypeError, ValueError):
+            return Response({"success": False, "message": "Client IDs must be numbers."}, status=status.HTTP_400_BAD_REQUEST)
+        if client.id in client_ids:
+            return Response({"success": False, "message": "A client cannot be merged into itself."}, status=status.HTTP_400_BAD_REQUEST)
+
+        missing = client_ids - set(Client.objects.filter(id__in=client_ids).values_list('id', flat=True))
+        if missing:
+            return Response({
+                "success": False,
+                "message": f"Client(s) not found: {', '.join(str(client_id) for client_id in sorted(missing))}."
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        counts = dedupe.merge_clients(client, client_ids)
+        client.refresh_from_db()
+        return Response({
+            "success": True,
+            "message": f"Merged {counts['merged']} client(s) into '{client}'.",
+            "data": {"client": ClientSerializer(client).data, **counts}
+        })
+
     def destroy(self, request, *args, **kwargs):
         client = self.get_object()
         client_name = str(client)
 
-        client.delete()
+        # Very large clients are deleted by a worker so the request returns immediately
+        item_count = SaleItem.objects.filter(sale__client=client).count()
+        if item_count > settings.CLIENT_DELETE_JOB_THRESHOLD:
+            job = enqueue('sales.delete_client', {"client_id": client.id}, user=request.user)
+            return accepted_response(job, f"Deletion of client '{client_name}' and {item_count} item(s) queued.")
+
+        total, counts = delete_client(client.id)
 
         return Response({
             "success": True,
-            "message": f"Client '{client_name}' and all related sales/items deleted successfully."
+            "message": f"Client '{client_name}' and all related sales/items deleted successfully.",
+            "data": {"deleted": total, "counts": counts}
         }, status=status.HTTP_200_OK)
 
 class SaleViewSet(viewsets.ModelViewSet):
     queryset = Sale.objects.all().order_by('-created_at')
     serializer_class = SaleSerializer
+    # Non-numeric ids 404 at the router instead of reaching pk lookups in detail actions (history)
+    lookup_value_regex = r'\d+'
 
     def get_queryset(self):
 
@@ -72,6 +215,7 @@ class SaleViewSet(viewsets.ModelViewSet):
 
         return queryset
 
+    @coalesced(per_user=False)
     def list(self, request, *args, **kwargs):
         queryset = self.get_queryset()
         serializer = self.get_serializer(queryset, many=True)
@@ -81,15 +225,34 @@ class SaleViewSet(viewsets.ModelViewSet):
             "data": serializer.data
         })
 
+    @coalesced(per_user=False)
     def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
+        try:
+            instance = self.get_object()
+        except Http404:
+            # ?include_archived=true falls back to the archive tables
+            if request.query_params.get('include_archived', '').lower() not in ('1', 'true', 'yes'):
+                raise
+            return self.retrieve_archived(kwargs[self.lookup_field])
         serializer = self.get_serializer(instance)
-        return Response({
+        return with_etag(Response({
             "success": True,
             "message": "Sale retrieved successfully.",
             "data": serializer.data
+        }), instance)
+
+    def retrieve_archived(self, pk):
+        try:
+            archived = ArchivedSale.objects.select_related('client', 'created_by').prefetch_related('items').get(pk=pk)
+        except (ArchivedSale.DoesNotExist, ValueError):
+            raise Http404
+        return Response({
+            "success": True,
+            "message": "Archived sale retrieved successfully.",
+            "data": ArchivedSaleSerializer(archived).data
         })
 
+    @idempotent
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -104,9 +267,24 @@ class SaleViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            audit.record_delete(instance)
+            delete_sales([instance.id])
+
+    def update(self, request, *args, **kwargs):
+        response = super().update(request, *args, **kwargs)
+        response['ETag'] = f'"{response.data["version"]}"'
+        return response
+
+    def perform_update(self, serializer):
+        serializer.save(expected_version=get_expected_version(self.request, serializer.instance))
+
     @action(detail=True, methods=['post'])
+    @idempotent
     def confirm(self, request, pk=None):
         sale = self.get_object()
+        expected_version = get_expected_version(request, sale)
         if sale.status != 'draft':
             return Response({"success" : False, "message": "Only draft sales can be confirmed."}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -119,27 +297,31 @@ class SaleViewSet(viewsets.ModelViewSet):
             except Client.DoesNotExist:
                 return Response({"success" : False, "message": "Client not found."}, status=status.HTTP_404_NOT_FOUND)
         elif client_data:
-            client_serializer = ClientSerializer(data=client_data)
+            client_serializer = ClientSerializer(data=client_data, context={'sale_id': sale.id})
             client_serializer.is_valid(raise_exception=True)
-            client = client_serializer.save()
         else:
             return Response({"success" : False, "message": "Provide client_id or client data."}, status=status.HTTP_400_BAD_REQUEST)
 
-        sale.client = client
-        sale.status = 'confirmed'
-        sale.save()
-        return Response({"success" : True, "message": "Sale confirmed successfully.", "data": self.get_serializer(sale).data})
+        with transaction.atomic():
+            if not client_id:
+                client = client_serializer.save()
+            if not sale.update_if_version(expected_version, client=client, status='confirmed'):
+                raise SaleVersionConflict()
+        return with_etag(Response({"success" : True, "message": "Sale confirmed successfully.", "data": self.get_serializer(sale).data}), sale)
 
     @action(detail=True, methods=['post'])
+    @idempotent
     def cancel(self, request, pk=None):
         sale = self.get_object()
+        expected_version = get_expected_version(request, sale)
         if sale.status == 'cancelled':
             return Response({"success" : False, "message": "Sale already cancelled."}, status=status.HTTP_400_BAD_REQUEST)
-        sale.status = 'cancelled'
-        sale.save()
-        return Response({"success" : True, "message": "Sale cancelled successfully.", "data": self.get_serializer(sale).data})
+        if not sale.update_if_version(expected_version, status='cancelled'):
+            raise SaleVersionConflict()
+        return with_etag(Response({"success" : True, "message": "Sale cancelled successfully.", "data": self.get_serializer(sale).data}), sale)
 
     @action(detail=True, methods=['post'])
+    @idempotent
     def add_items(self, request, pk=None):
         sale = self.get_object()
         if sale.status == 'cancelled':
@@ -149,14 +331,19 @@ class SaleViewSet(viewsets.ModelViewSet):
         if not items_data or not isinstance(items_data, list):
             return Response({"success" : False, "message": "Provide a list of items."}, status=status.HTTP_400_BAD_REQUEST)
 
-        for item_data in items_data:
-            serializer = SaleItemSerializer(data=item_data)
-            serializer.is_valid(raise_exception=True)
-            serializer.save(sale=sale)
+        expected_version = get_expected_version(request, sale)
+        with transaction.atomic():
+            if not sale.update_if_version(expected_version):
+                raise SaleVersionConflict()
+            for item_data in items_data:
+                serializer = SaleItemSerializer(data=item_data)
+                serializer.is_valid(raise_exception=True)
+                audit.record_create(serializer.save(sale=sale))
 
-        return Response({"success" : True, "message": "Items added successfully.", "data": self.get_serializer(sale).data}, status=status.HTTP_200_OK)
+        return with_etag(Response({"success" : True, "message": "Items added successfully.", "data": self.get_serializer(sale).data}, status=status.HTTP_200_OK), sale)
 
     @action(detail=True, methods=['post'])
+    @idempotent
     def remove_items(self, request, pk=None):
         sale = self.get_object()
         if sale.status == 'cancelled':
@@ -166,11 +353,147 @@ class SaleViewSet(viewsets.ModelViewSet):
         if not items_ids or not isinstance(items_ids, list):
             return Response({"success" : False, "message": "Provide a list of item IDs."}, status=status.HTTP_400_BAD_REQUEST)
 
-        items = sale.items.filter(id__in=items_ids)
-        count = items.count()
-        items.delete()
+        expected_version = get_expected_version(request, sale)
+        with transaction.atomic():
+            if not sale.update_if_version(expected_version):
+                raise SaleVersionConflict()
+            items = list(sale.items.filter(id__in=items_ids))
+            for item in items:
+                audit.record_delete(item)
+            count = len(items)
+            doomed = sale.items.filter(id__in=[item.id for item in items])
+            sync.record_deletes(doomed)
+            doomed.delete()
+
+        return with_etag(Response({"success" : True, "message": f"{count} item(s) removed from the sale."}, status=status.HTTP_200_OK), sale)
+
+    @action(detail=False, methods=['post'])
+    def recalculate_totals(self, request):
+        """
+        Recompute item prices and totals in the background.
+        Pass sale_ids: [..] to limit it to some sales; returns 202 with the job to poll.
+        """
+        sale_ids = request.data.get('sale_ids')
+        if sale_ids is not None and not isinstance(sale_ids, list):
+            return Response({"success" : False, "message": "sale_ids must be a list."}, status=status.HTTP_400_BAD_REQUEST)
+
+        job = enqueue('sales.recalculate_totals', {"sale_ids": sale_ids}, user=request.user)
+        return accepted_response(job, "Total recalculation queued.")
 
-        return Response({"success" : True, "message": f"{count} item(s) removed from the sale."}, status=status.HTTP_200_OK)
+    @action(detail=True, methods=['get'])
+    def room_breakdown(self, request, pk=None):
+        """
+        Items of a sale grouped by room and category.
+        Subtotals are computed with GROUP BY in the database; pass ?room= to narrow to one room.
+        """
+        sale = self.get_object()
+        room = request.query_params.get('room')
+
+        items = sale.items.order_by('room', 'category', 'id')
+        if room:
+            items = items.filter(room=room)
+
+        subtotals = (
+            items.order_by()
+            .values('room', 'category')
+            .annotate(subtotal=Sum('total_amount'), item_count=Count('id'))
+            .order_by('room', 'category')
+        )
+
+        rooms = {}
+        for row in subtotals:
+            room_entry = rooms.setdefault(row['room'], {
+                "room": row['room'],
+                "subtotal": Decimal('0.00'),
+                "item_count": 0,
+                "categories": {},
+            })
+            room_entry["subtotal"] += row['subtotal'] or Decimal('0.00')
+            room_entry["item_count"] += row['item_count']
+            room_entry["categories"][row['category']] = {
+                "category": row['category'],
+                "subtotal": row['subtotal'] or Decimal('0.00'),
+                "item_count": row['item_count'],
+                "items": [],
+            }
+
+        items = list(items)
+        for item, data in zip(items, SaleItemSerializer(items, many=True).data):
+            rooms[item.room]["categories"][item.category]["items"].append(data)
+
+        grand_total = Decimal('0.00')
+        for room_entry in rooms.values():
+            grand_total += room_entry["subtotal"]
+            room_entry["subtotal"] = f"{room_entry['subtotal']:.2f}"
+            room_entry["categories"] = list(room_entry["categories"].values())
+            for category_entry in room_entry["categories"]:
+                category_entry["subtotal"] = f"{category_entry['subtotal']:.2f}"
+
+        return Response({
+            "success": True,
+            "message": "Room breakdown retrieved successfully.",
+            "data": {
+                "sale_id": sale.id,
+                "total_amount": f"{grand_total:.2f}",
+                "rooms": list(rooms.values()),
+            }
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'])
+    @idempotent
+    def clone(self, request, pk=None):
+        """
+        Duplicate the sale and its items as a new draft, copied inside the database.
+
+        Pass (all optional):
+        - client_id: client for the new draft (defaults to the original's client)
+        - rooms: ["Kitchen", null, ...] to copy only items in these rooms (null: items without a room;
+          [] copies no items)
+        """
+        sale = self.get_object()
+
+        client = sale.client
+        client_id = request.data.get('client_id')
+        if client_id:
+            try:
+                client = Client.objects.get(id=client_id)
+            except (Client.DoesNotExist, ValueError, TypeError):
+                return Response({"success" : False, "message": "Client not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        rooms = request.data.get('rooms')
+        if rooms is not None and not (
+                isinstance(rooms, list) and all(room is None or isinstance(room, str) for room in rooms)):
+            return Response({"success" : False, "message": "rooms must be a list of room names (or null)."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        new_sale, item_count = clone_sale(sale, request.user, client, rooms)
+        new_sale = Sale.objects.select_related('client', 'created_by').prefetch_related('items').get(pk=new_sale.pk)
+        return with_etag(Response({
+            "success": True,
+            "message": f"Sale cloned as draft #{new_sale.id} with {item_count} item(s).",
+            "data": self.get_serializer(new_sale).data
+        }, status=status.HTTP_201_CREATED), new_sale)
+
+    @action(detail=True, methods=['get'])
+    def history(self, request, pk=None):
+        """
+        Change history of the sale, its items and client edits made through it, newest first.
+        Still answers after the sale is deleted, as long as it has history.
+        """
+        entries = HistoryEntry.objects.filter(sale_id=pk)
+        if not (Sale.objects.filter(pk=pk).exists() or ArchivedSale.objects.filter(pk=pk).exists()
+                or entries.exists()):
+            return Response({"success": False, "message": "Sale not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        entries = entries.select_related('user').order_by('-id')
+        paginator = CustomPagination()
+        page = paginator.paginate_queryset(entries, request, view=self)
+        response = paginator.get_paginated_response(HistoryEntrySerializer(page, many=True).data)
+        return Response({
+            "success": True,
+            "message": "Sale history retrieved successfully.",
+            "data": response.data
+        })
 
     @action(detail=True, methods=['put', 'patch'])
     def update_with_client(self, request, pk=None):
@@ -182,6 +505,7 @@ class SaleViewSet(viewsets.ModelViewSet):
         - client_data: {client data} to update/create client
         - items: [{item data}] to update items
         - status: to update sale status
+        - version (or an If-Match header): version last read; 409 if the sale changed since
         
         Example:
         {
@@ -203,16 +527,17 @@ class SaleViewSet(viewsets.ModelViewSet):
         # Use the serializer for updating
         serializer = SaleWithClientUpdateSerializer(sale, data=request.data, partial=request.method == 'PATCH')
         serializer.is_valid(raise_exception=True)
-        updated_sale = serializer.save()
+        updated_sale = serializer.save(expected_version=get_expected_version(request, sale))
 
-        return Response({
+        return with_etag(Response({
             "success": True,
             "message": "Sale updated successfully.",
             "data": SaleSerializer(updated_sale).data
-        }, status=status.HTTP_200_OK)
+        }, status=status.HTTP_200_OK), updated_sale)
 
 class SaleItemChoicesView(APIView):
 
+    @coalesced(per_user=False)
     def get(self, request):
         categories = [name for code, name in SaleItem.CATEGORY_CHOICES]
         discount_types = [name for code, name in SaleItem.DISCOUNT_TYPE_CHOICES]
@@ -224,6 +549,7 @@ class SaleItemChoicesView(APIView):
     
 class SaleItemListView(APIView):
 
+    @coalesced(per_user=False)
     def get(self, request, *args, **kwargs):
         sale_id = request.query_params.get('sale_id')
         room = request.query_params.get('room')
@@ -248,4 +574,143 @@ class SaleItemListView(APIView):
             "success": True,
             "message": "Sale items retrieved successfully.",
             "data": serializer.data
-        }, status=status.HTTP_200_OK)
\ No newline at end of file
+        }, status=status.HTTP_200_OK)
+
+class SaleQuotePDFView(APIView):
+
+    def get(self, request, pk):
+        try:
+            sale = Sale.objects.select_related('client').get(id=pk)
+        except Sale.DoesNotExist:
+            return Response({"success": False, "message": "Sale not found."},
+                            status=status.HTTP_404_NOT_FOUND)
+
+        response = HttpResponse(render_quote_pdf(sale), content_type='application/pdf')
+        response['Content-Disposition'] = f'inline; filename="quote-{sale.id}.pdf"'
+        return response
+
+
+
+class SyncView(APIView):
+
+    def get(self, request):
+        """
+        Clients, sales and sale items changed or deleted since ?since=<cursor> (omit it for a
+        full download), at most ?page_size= rows of each per page. Keep calling with the
+        returned cursor while has_more is true. reset=true means the cursor is too old:
+        discard local data and download everything again.
+        """
+        page_size = request.query_params.get('page_size') or None
+        try:
+            page_size = int(page_size) if page_size is not None else None
+        except ValueError:
+            page_size = 0
+        if page_size is not None and page_size < 1:
+            return Response({"success": False, "message": "page_size must be a positive number."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            result = sync.changes(request.query_params.get('since') or None, page_size)
+        except sync.InvalidCursor as exc:
+            return Response({"success": False, "message": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if result['reset']:
+            return Response({
+                "success": True,
+                "message": "Sync cursor expired; download everything again.",
+                "data": {"reset": True, "cursor": None, "has_more": False}
+            })
+
+        rows = result['rows']
+        return Response({
+            "success": True,
+            "message": "Changes retrieved successfully.",
+            "data": {
+                "reset": False,
+                "clients": ClientSerializer(rows['clients'], many=True).data,
+                "sales": SyncSaleSerializer(rows['sales'], many=True).data,
+                "sale_items": SaleItemSerializer(rows['sale_items'], many=True).data,
+                "deleted": TombstoneSerializer(rows['deleted'], many=True).data,
+                "cursor": result['cursor'],
+                "has_more": result['has_more'],
+            }
+        })
+
+
+class EventStreamAuthentication(JWTAuthentication):
+    """Bearer header as usual, or ?access_token= for browser EventSource, which can't set headers."""
+
+    def authenticate(self, request):
+        token = request.GET.get('access_token')
+        if not token:
+            return super().authenticate(request)
+        validated_token = self.get_validated_token(token.encode())
+        return self.get_user(validated_token), validated_token
+
+
+class SaleEventsView(APIView):
+    """
+    Server-Sent Events feed of sale and sale item changes, for all sales or one (pk).
+    The streams are served by sales.sse.SaleEventsHandler and need the ASGI app
+    (proxima.asgi). Under WSGI Django reads an async stream to the end before sending
+    anything, and this one never ends, so these URLs answer 501 there instead.
+    """
+    authentication_classes = [EventStreamAuthentication]
+
+    def get(self, request, pk=None):
+        return Response({"success": False, "message": "Event streams are only served by the ASGI application."},
+                        status=status.HTTP_501_NOT_IMPLEMENTED)
+
+
+class CSVImportView(APIView):
+    parser_classes = [MultiPartParser]
+
+    def post(self, request, kind):
+        """Upload a CSV ("file") of clients or sale_items; it is imported by a background job."""
+        if kind not in IMPORT_KINDS:
+            return Response({"success": False, "message": f"Unknown import kind. Use one of: {', '.join(IMPORT_KINDS)}."},
+                            status=status.HTTP_404_NOT_FOUND)
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"success": False, "message": "Upload a CSV file as 'file'."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        os.makedirs(settings.IMPORT_DIR, exist_ok=True)
+        name = uuid.uuid4().hex
+        path = os.path.join(settings.IMPORT_DIR, f"{name}.csv")
+        with open(path, 'wb') as destination:
+            for chunk in upload.chunks():
+                destination.write(chunk)
+
+        job = enqueue('sales.import_csv', {
+            "kind": kind,
+            "path": path,
+            "user_id": request.user.id,
+            "errors_path": os.path.join(settings.IMPORT_DIR, f"{name}.errors.csv"),
+        }, user=request.user, max_attempts=1)
+        return accepted_response(job, f"Import of {kind} queued.")
+
+
+class CSVImportErrorsView(APIView):
+
+    def get(self, request, job_id):
+        """Download the per-row error report of an import job."""
+        job = Job.objects.filter(id=job_id, name='sales.import_csv').first()
+        if job and not (request.user.is_staff or job.created_by_id == request.user.id):
+            job = None  # someone else's import: answer as if it didn't exist
+        errors_path = job.payload.get('errors_path') if job else None
+        if not errors_path or not os.path.exists(errors_path):
+            return Response({"success": False, "message": "Error report not found."},
+                            status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(open(errors_path, 'rb'), as_attachment=True,
+                            filename=f"import-{job.id}-errors.csv", content_type='text/csv')
+
+
+class CoalescingStatsView(APIView):
+    """Request coalescing counters (sales/coalescing.py) of the worker process that serves this request."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            "success": True,
+            "message": "Coalescing stats retrieved successfully.",
+            "data": {"pid": os.getpid(), "routes": coalescing.flights.metrics.snapshot()}
+        })